@@ -18,11 +18,17 @@ import yaml
 
 from log_parser import parse_test_results , identify_test_frameworks_and_count_dependencies , identify_build_language , get_github_actions_log
 from patterns import framework_regex
-from commit_history_analyzer import get_commit_data_local, clone_repo_locally , calculate_sloc_and_test_lines
+from commit_history_analyzer import get_commit_data_local, clone_repo_locally , calculate_sloc_and_test_lines, release_repo_resources, configure_commit_cache, CommitAnalysisPool, fetch_missing_commits, configure_git_backend
 from repo_info_collector import get_repository_languages , get_workflow_ids , count_lines_in_workflow_yml , get_workflow_all_ids
-from metrics_aggregator import save_builds_to_file
+from metrics_aggregator import save_builds_to_file, create_build_sink
 from build_run_analyzer import get_jobs_for_run , get_builds_info_from_build_yml , calculate_description_complexity
-from request_github import get_request
+from run_listing import iter_run_pages, prefetch_run_pages, build_created_filter, find_next_older_runs, RunListingError
+from sync_state import WatermarkStore
+from enrichment_engine import enrich_runs, DEFAULT_MAX_CONCURRENT_REQUESTS, DEFAULT_RUN_WINDOW
+from token_pool import TokenPool
+from commit_cache import DEFAULT_MAX_ENTRIES
+from clone_cache import MirrorCache, DEFAULT_MAX_GB
+from request_github import get_request, github_get, configure_session, configure_response_cache, configure_throttle, DEFAULT_POOL_SIZE, DEFAULT_MAX_RETRIES, DEFAULT_BURST
 
 
 github_token = ''  
@@ -87,10 +93,9 @@ def fetch_file_content(repo_full_name, path, commit_sha, token):
         return None  # Skip if path is empty
 
     url = f"https://api.github.com/repos/{repo_full_name}/contents/{path}?ref={commit_sha}"
-    headers = {'Authorization': f'token {token}'}
     
     try:
-        response = requests.get(url, headers=headers)
+        response = github_get(url, token)
 
         if response.status_code == 200:
             file_data = response.json()
@@ -163,9 +168,8 @@ def get_github_repo_files(owner, repo, token=None):
     Fetch the list of files in the root of a GitHub repository.
     """
     url = f"https://api.github.com/repos/{owner}/{repo}/contents/"
-    headers = {"Authorization": f"token {token}"} if token else {}
 
-    response = requests.get(url, headers=headers)
+    response = github_get(url, token)
     response.raise_for_status()
     return [file['name'] for file in response.json() if file['type'] == 'file']
 
@@ -179,30 +183,43 @@ import numpy as np
 from datetime import datetime
 import logging
 
-def get_existing_build_ids(repo_full_name, output_csv):
-    """
-    Read the CSV file and return a set of existing build IDs for the given repo.
-    This ensures we only fetch new builds.
-    """
-    if not os.path.exists(output_csv):
-        return set()  # If file doesn't exist, process from scratch
-
-    try:
-        df = pd.read_csv(output_csv, usecols=['repo', 'id_build'])
-        df = df[df['repo'] == repo_full_name]
-        return set(df['id_build'].astype(str))  # Store existing IDs as strings for consistency
-    except Exception as e:
-        logging.error(f"Error reading existing build IDs from {output_csv}: {e}")
-        return set()
-
-def get_builds_info(repo_full_name, token, output_csv, framework_regex , config):
+def get_builds_info(repo_full_name, token, build_sink, framework_regex , config, from_date=None, to_date=None):
     base_path = os.path.dirname(os.path.abspath(__file__))  # Get project folder path
     repo_url = f"https://github.com/{repo_full_name}.git"
-    local_repo_path = clone_repo_locally(repo_url, base_path)
+
+    # Only the git metrics (commit details, SLOC) need a local copy of the repository
+    local_repo_path = None
+    mirror_cache_dir = config.get("mirror_cache_dir")
+    if config.get("fetch_commit_details", False) or config.get("fetch_sloc", False):
+        if mirror_cache_dir:
+            # Reuse the bare mirror of previous crawls; only new objects are fetched
+            mirror_cache = MirrorCache(mirror_cache_dir, max_bytes=config.get("mirror_cache_max_gb", DEFAULT_MAX_GB) * 1024 ** 3,
+                                       commit_graph=config.get("mirror_commit_graph", True))
+            # A blobless mirror downloads file contents one blob at a time when they are read: the
+            # line counts of the commit details and SLOC read them, so it only serves metadata metrics
+            blobless = config.get("mirror_blobless", False)
+            if blobless and (config.get("fetch_commit_details", False) or config.get("fetch_sloc", False)):
+                logging.warning("mirror_blobless is ignored: fetch_commit_details and fetch_sloc read file contents.")
+                blobless = False
+            local_repo_path = mirror_cache.get_mirror(repo_full_name, blobless=blobless)
+        else:
+            local_repo_path = clone_repo_locally(repo_url, base_path)
+
+    # Commits attributed to a run: by dates ('date') or by the range from the previous run's head commit ('range')
+    commit_window_mode = config.get("commit_window_mode", "date")
+
+    # Optional worker processes for the commit metrics (0 computes them inline)
+    commit_pool = None
+    commit_analysis_workers = config.get("commit_analysis_workers", 0)
+    if local_repo_path and commit_analysis_workers and config.get("fetch_commit_details", False):
+        commit_pool = CommitAnalysisPool(
+            local_repo_path, commit_analysis_workers,
+            config.get("commit_cache_path"), config.get("commit_cache_max_entries", DEFAULT_MAX_ENTRIES),
+        )
 
 
     # Get already recorded build IDs
-    existing_build_ids = get_existing_build_ids(repo_full_name, output_csv)
+    existing_build_ids = build_sink.existing_build_ids(repo_full_name)
 
     # Fetch workflows (filtered by config if specified, otherwise all)
     specific_workflow_ids = config.get("workflow_ids", [])
@@ -217,106 +234,217 @@ def get_builds_info(repo_full_name, token, output_csv, framework_regex , config)
     )
 
 
-    for workflow_id in build_workflow_ids:
-        total_builds = 0
-        page = 1
-        sloc_initial = test_lines_initial = test_lines_per_1000_sloc = 0
-        last_end_date = None
-
-        while True:
-            api_url = f"https://api.github.com/repos/{repo_full_name}/actions/workflows/{workflow_id}/runs?page={page}&per_page=100"
-            response = requests.get(api_url, headers={'Authorization': f'token {token}'})  # Make request
+    # List the runs once for the whole repo (filtered to the selected workflows client-side)
+    # or once per workflow; the date range is applied server-side with the `created` qualifier
+    created_filter = build_created_filter(from_date, to_date)
+    listing_mode = config.get("runs_listing_mode", "auto")
+    if listing_mode == "auto":
+        listing_mode = "workflow" if specific_workflow_ids else "repo"
+    if not build_workflow_ids:
+        listing_scopes = []
+    elif listing_mode == "repo":
+        listing_scopes = [None]
+    else:
+        listing_scopes = build_workflow_ids
+    selected_workflow_ids = set(build_workflow_ids)
 
-            if response.status_code != 200:
-                logging.error(f"Failed to fetch builds for {repo_full_name} (workflow: {workflow_id}, page: {page}), status: {response.status_code}")
-                break  # Stop if request fails
+    total_builds = {}  # Running count of builds processed per workflow
+    sloc_initial = test_lines_initial = test_lines_per_1000_sloc = 0
 
-            response_data = response.json()
-            time.sleep(1)
+    # High-water marks of previous syncs let the listing stop at already-ingested runs
+    watermarks = None
+    if config.get("incremental_sync", False):
+        watermarks = WatermarkStore(config.get("sync_state_file", "sync_state.json"))
 
-            if 'workflow_runs' in response_data and response_data['workflow_runs']:
-                builds_info = []
-                workflow_runs = response_data['workflow_runs'] 
-                #workflow_runs = sorted(workflow_runs, key=lambda run: run['created_at'])
+    for listing_workflow_id in listing_scopes:
+        scope = f"workflow {listing_workflow_id}" if listing_workflow_id is not None else "all workflows"
 
-                for idx, run in enumerate(workflow_runs):
-                    run_id = str(run['id'])  # Convert ID to string for consistency
-        
-                    if run_id in existing_build_ids:
-                        logging.info(f"Skipping existing build {run_id}")
-                        continue  # Skip already processed builds
-
-                    # If it's a new build, process it
-                    existing_build_ids.add(run_id)
-                    total_builds += 1
-
-                    start_time = time.time()
-
-                    # Extract necessary data
-                    commit_sha = run['head_sha']
-                    run_date = datetime.strptime(run['created_at'], '%Y-%m-%dT%H:%M:%SZ')
-                    workflow_name = run.get('name', 'Unknown Workflow')
-                    workflow_filename = run.get('path', 'unknown_workflow.yml')
-                    event_trigger = run.get('event', 'unknown')
-                    issuer = run.get('actor', {}).get('login', 'unknown')
-                    workflow_id = run.get('workflow_id', 'unknown')
-
-                    # Determine the next run's date (run+1)
-                    run_plus_1_date = None
-                    if idx + 1 < len(workflow_runs):
-                        run_plus_1_date = datetime.strptime(workflow_runs[idx + 1]['created_at'], '%Y-%m-%dT%H:%M:%SZ')
-                    
-
-                    if config.get("fetch_sloc", False):
-                        print(f"Calculating repo SLOC & test lines for first run of workflow {workflow_id}")
-                        timestamp_str = run_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-                        sloc_initial, test_lines_initial = calculate_sloc_and_test_lines(local_repo_path, commit_sha=commit_sha, timestamp=timestamp_str)
-                        test_lines_per_1000_sloc = (test_lines_initial / sloc_initial) * 1000
-
-                    # get commits data within the range of this run and previous run
-                    commit_data = {}
-                    if config.get("fetch_commit_details", False):
-                        commit_data = get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date)
-
-                    # Fetch line count of the workflow YAML file
-                    workflow_size = count_lines_in_workflow_yml(repo_full_name, workflow_filename, commit_sha, token)
-                    if workflow_size is None:
-                        workflow_size = None  # Ensure NaN is recorded
-
-
-                    # time to fetch 1 row of data
-                    duration_to_fetch = time.time() - start_time
-
-                    # Compile the build info
-                    build_info = compile_build_info(
-                        run, repo_full_name, commit_data, sloc_initial , test_lines_per_1000_sloc,  commit_sha, languages, total_builds,
-                        build_language, test_frameworks, dependency_count, workflow_size, framework_regex ,workflow_name, event_trigger, issuer, workflow_id, duration_to_fetch,
-                        config
-                    )
-                    builds_info.append(build_info)
-
-                    save_builds_to_file(builds_info, output_csv)
-
-                logging.info(f"Processed page {page} of builds for workflow {workflow_id}")
+        # Repo-wide listings keep one watermark per set of selected workflows
+        if listing_workflow_id is not None:
+            watermark_key = listing_workflow_id
+        else:
+            watermark_key = '*' if not specific_workflow_ids else '*:' + ','.join(str(wid) for wid in sorted(selected_workflow_ids))
+
+        # Runs at or below the watermark were all ingested by a previous sync
+        stop_run_id = watermarks.get_run_id(repo_full_name, watermark_key) if watermarks is not None else None
+
+        newest_run = None  # Newest run listed, becomes the next watermark
+        reached_watermark = False
+        pages_past_watermark = 0
+        listing_complete = True
+        prefetch_workers = config.get("runs_prefetch_workers", 0)
+        if prefetch_workers:
+            # Pages are downloaded ahead in the background while this loop enriches the current one
+            run_pages = prefetch_run_pages(repo_full_name, token, workflow_id=listing_workflow_id, created=created_filter,
+                                           workers=prefetch_workers, queue_size=config.get("runs_prefetch_queue_size", prefetch_workers),
+                                           stop_run_id=stop_run_id)
+        else:
+            run_pages = iter_run_pages(repo_full_name, token, workflow_id=listing_workflow_id, created=created_filter)
 
+        deferred_runs = []  # New runs whose next older run was not listed yet
+        while True:
+            try:
+                page, page_runs = next(run_pages)
+            except StopIteration:
+                page, page_runs = None, []
+            except RunListingError:
+                # Pages after the watermark were ingested by a previous sync, so only earlier gaps count
+                if not reached_watermark:
+                    listing_complete = False
+                page, page_runs = None, []
+            if page is None and not deferred_runs:
+                break
+
+            page_workflow_runs = [run for run in page_runs if run.get('workflow_id') in selected_workflow_ids]
+            for run in page_workflow_runs:
+                if newest_run is None or run['id'] > newest_run['id']:
+                    newest_run = run
+            workflow_runs = deferred_runs + page_workflow_runs
+
+            # Runs of every workflow count: all the runs listed after one at or below the watermark are older
+            if stop_run_id is not None and any(run['id'] <= stop_run_id for run in page_runs):
+                logging.info(f"Reached the sync watermark of {repo_full_name} ({scope}) on page {page}.")
+                reached_watermark = True
+
+            # Neighbours are looked up on the whole page, runs below the watermark included
+            #workflow_runs = sorted(workflow_runs, key=lambda run: run['created_at'])
+            next_older_runs = find_next_older_runs(workflow_runs)
+
+            # Range-based commit window: head commit of the previous run of the same workflow and branch
+            previous_head_shas = {}
+            if commit_window_mode == "range":
+                for idx, older_idx in enumerate(find_next_older_runs(workflow_runs, same_branch=True)):
+                    if older_idx is not None:
+                        previous_head_shas[workflow_runs[idx]['id']] = workflow_runs[older_idx]['head_sha']
+
+            # The oldest new run of each workflow waits for the next page, where its next older
+            # run is, unless no page follows: end of the listing, or the page after the watermark
+            if reached_watermark:
+                pages_past_watermark += 1
+            last_batch = page is None or pages_past_watermark > 1
+            deferred_runs = []
+            new_run_indices = []
+            for idx, run in enumerate(workflow_runs):
+                run_id = str(run['id'])  # Convert ID to string for consistency
+
+                if stop_run_id is not None and run['id'] <= stop_run_id:
+                    continue  # Ingested by a previous sync, only used as a neighbour
+
+                if run_id in existing_build_ids:
+                    logging.info(f"Skipping existing build {run_id}")
+                    continue  # Skip already processed builds
+
+                if not last_batch and next_older_runs[idx] is None:
+                    deferred_runs.append(run)
+                    continue
+
+                # If it's a new build, process it
+                existing_build_ids.add(run_id)
+                new_run_indices.append(idx)
+
+            # Fetch the API-side data (jobs, logs, PR, workflow file) of all new runs concurrently
+            enrichments = enrich_runs(
+                [get_run_enrichment_tasks(workflow_runs[idx], repo_full_name, token, build_language, test_frameworks, framework_regex, config)
+                 for idx in new_run_indices],
+                max_concurrent_requests=config.get("enrichment_max_concurrent_requests", DEFAULT_MAX_CONCURRENT_REQUESTS),
+                run_window=config.get("enrichment_run_window", DEFAULT_RUN_WINDOW),
+            )
+
+            # Download the head commits of the new runs that are not in the clone yet, in one fetch
+            if local_repo_path and new_run_indices:
+                fetch_missing_commits(local_repo_path, [workflow_runs[idx]['head_sha'] for idx in new_run_indices] +
+                                      [previous_head_shas[workflow_runs[idx]['id']] for idx in new_run_indices
+                                       if workflow_runs[idx]['id'] in previous_head_shas])
+
+            # Compute the commit metrics of all new runs in the worker processes, in run order
+            pooled_commit_data = None
+            if commit_pool is not None:
+                pooled_commit_data = commit_pool.map([
+                    (workflow_runs[idx]['head_sha'],
+                     datetime.strptime(workflow_runs[idx]['created_at'], '%Y-%m-%dT%H:%M:%SZ'),
+                     datetime.strptime(workflow_runs[next_older_runs[idx]]['created_at'], '%Y-%m-%dT%H:%M:%SZ')
+                     if next_older_runs[idx] is not None else None,
+                     previous_head_shas.get(workflow_runs[idx]['id']))
+                    for idx in new_run_indices
+                ])
+
+            for position, (idx, enrichment) in enumerate(zip(new_run_indices, enrichments)):
+                run = workflow_runs[idx]
+
+                start_time = time.time()
+
+                # Extract necessary data
+                commit_sha = run['head_sha']
+                run_date = datetime.strptime(run['created_at'], '%Y-%m-%dT%H:%M:%SZ')
+                workflow_name = run.get('name', 'Unknown Workflow')
+                event_trigger = run.get('event', 'unknown')
+                issuer = run.get('actor', {}).get('login', 'unknown')
+                workflow_id = run.get('workflow_id', 'unknown')
+                total_builds[workflow_id] = total_builds.get(workflow_id, 0) + 1
+
+                # Determine the date of the next (older) run of the same workflow (run+1)
+                run_plus_1_date = None
+                if next_older_runs[idx] is not None:
+                    run_plus_1_date = datetime.strptime(workflow_runs[next_older_runs[idx]]['created_at'], '%Y-%m-%dT%H:%M:%SZ')
+                
+
+                if config.get("fetch_sloc", False):
+                    print(f"Calculating repo SLOC & test lines for first run of workflow {workflow_id}")
+                    timestamp_str = run_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+                    sloc_initial, test_lines_initial = calculate_sloc_and_test_lines(local_repo_path, commit_sha=commit_sha, timestamp=timestamp_str)
+                    test_lines_per_1000_sloc = (test_lines_initial / sloc_initial) * 1000
+
+                # get commits data within the range of this run and previous run
+                commit_data = {}
+                if pooled_commit_data is not None:
+                    commit_data = pooled_commit_data[position]
+                elif config.get("fetch_commit_details", False):
+                    commit_data = get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date,
+                                                        previous_head_shas.get(run['id']))
+
+                # Line count of the workflow YAML file (fetched by the enrichment engine)
+                workflow_size = enrichment['workflow_size']
+
+
+                # time to fetch 1 row of data (local analysis + concurrent API calls of this run)
+                duration_to_fetch = time.time() - start_time + enrichment['fetch_duration']
+
+                # Compile the build info
+                build_info = compile_build_info(
+                    run, repo_full_name, commit_data, sloc_initial , test_lines_per_1000_sloc,  commit_sha, languages, total_builds[workflow_id],
+                    build_language, test_frameworks, dependency_count, workflow_size, framework_regex ,workflow_name, event_trigger, issuer, workflow_id, duration_to_fetch,
+                    enrichment, config
+                )
+                build_sink.add(build_info)
+
+            if page is not None:
+                logging.info(f"Processed page {page} of builds for {scope}")
             else:
-                logging.info(f"No workflow runs found on page {page} for workflow {workflow_id}.")
-                break  # Stop if no more data
+                logging.info(f"Processed the last runs of {scope}")
 
-            # **Fix Pagination Handling**
-            if 'next' in response.headers.get('Link', ''):
-                page += 1
-            else:
-                break  # No more pages left
+            if last_batch or (reached_watermark and not deferred_runs):
+                break  # End of the listing, or older runs were ingested by a previous sync
+
+        run_pages.close()  # Stops any page prefetching that is still running
+        build_sink.flush()  # Persist the builds before the watermark moves past them
+
+        # Only advance the watermarks when everything below them has been ingested
+        if watermarks is not None and newest_run is not None and listing_complete and (from_date is None or reached_watermark):
+            watermarks.advance(repo_full_name, watermark_key, newest_run['id'], newest_run['created_at'])
 
     logging.info(f"Finished processing {repo_full_name}. Cleaning up...")
 
-    # Delete cloned repository
-    if os.path.exists(local_repo_path):
+    if commit_pool is not None:
+        commit_pool.close()
+
+    # Stop the git cat-file processes and drop the indexes of the repository
+    if local_repo_path:
+        release_repo_resources(local_repo_path)
+
+    # Delete the temporary clone (mirrors of the clone cache are kept for the next crawl)
+    if local_repo_path and not mirror_cache_dir and os.path.exists(local_repo_path):
         shutil.rmtree(local_repo_path, ignore_errors=True)
         logging.info(f"Deleted temporary repository: {local_repo_path}")
-
-    time.sleep(15)  # Prevent token exhaustion
     #unique_contributors.clear()
 
 
@@ -327,8 +455,62 @@ def get_builds_info(repo_full_name, token, output_csv, framework_regex , config)
 
 
 
+def fetch_test_results(repo_full_name, run_id, token, determined_framework, build_language, framework_regex):
+    """
+    Download the logs of a workflow run and accumulate the parsed test results over all log files.
+    """
+    cumulative_test_results = {'passed': 0, 'failed': 0, 'skipped': 0, 'total': 0}
+    build_log = get_github_actions_log(repo_full_name, run_id, token)
+
+    try:
+        with zipfile.ZipFile(io.BytesIO(build_log), 'r') as zip_ref:
+            for file_info in zip_ref.infolist():
+                if file_info.filename.endswith('.txt'):
+                    with zip_ref.open(file_info) as log_file:
+                        for line in log_file:
+                            log_content = line.decode('utf-8').strip()  # Process line-by-line
+                            if log_content:
+                                test_results = parse_test_results(determined_framework, log_content, build_language, framework_regex)
+                                cumulative_test_results['passed'] += test_results['passed']
+                                cumulative_test_results['failed'] += test_results['failed']
+                                cumulative_test_results['skipped'] += test_results['skipped']
+                                cumulative_test_results['total'] += test_results['total']
+                                print(f"Parsed test results from {file_info.filename}: {test_results}")
+    except zipfile.BadZipFile:
+        print(f"Failed to unzip log file for build {run_id}")
+
+    return cumulative_test_results
+
+
+def get_run_enrichment_tasks(run, repo_full_name, token, build_language, test_frameworks, framework_regex, config):
+    """
+    Describe the independent API calls needed for one run as {name: (callable, args)},
+    to be executed concurrently by the enrichment engine.
+    """
+    commit_sha = run['head_sha']
+    workflow_filename = run.get('path', 'unknown_workflow.yml')
+
+    tasks = {
+        'workflow_size': (count_lines_in_workflow_yml, (repo_full_name, workflow_filename, commit_sha, token)),
+    }
+
+    if config.get("fetch_job_details", False):
+        tasks['jobs'] = (get_jobs_for_run, (repo_full_name, run['id'], token))
+
+    if config.get("fetch_test_parsing_results", False):
+        # You may get multiple frameworks; decide how to handle this case
+        determined_framework = test_frameworks[0] if test_frameworks else "unknown"  # Default or handle appropriately
+        tasks['test_results'] = (fetch_test_results, (repo_full_name, run['id'], token, determined_framework, build_language, framework_regex))
+
+    if config.get("fetch_pull_request_details", False):
+        tasks['pr_details'] = (fetch_pull_request_details, (repo_full_name, commit_sha, token))
+
+    return tasks
+
+
 def compile_build_info(run, repo_full_name, commit_data, sloc_initial, test_lines_per_1000_sloc, commit_sha, languages, total_builds,
-                       build_language, test_frameworks , dependency_count , workflow_size , framework_regex , workflow_name, event_trigger, issuer, workflow_id, duration_to_fetch , config):
+                       build_language, test_frameworks , dependency_count , workflow_size , framework_regex , workflow_name, event_trigger, issuer, workflow_id, duration_to_fetch ,
+                       enrichment, config):
     # Parsing build start and end times for the LATEST attempt
     # run_started_at gives the start time of the latest attempt (not created_at which is the first attempt)
     run_attempt = run.get('run_attempt', 1)
@@ -338,7 +520,7 @@ def compile_build_info(run, repo_full_name, commit_data, sloc_initial, test_line
     duration = (end_time - start_time).total_seconds()
 
     if config.get("fetch_job_details", False):
-        jobs_ids, job_details, job_count = get_jobs_for_run(repo_full_name, run['id'], github_token)
+        jobs_ids, job_details, job_count = enrichment['jobs']
         
         # Filter out skipped jobs and steps
         non_skipped_jobs = [
@@ -357,36 +539,14 @@ def compile_build_info(run, repo_full_name, commit_data, sloc_initial, test_line
         )
 
 
-
-    # You may get multiple frameworks; decide how to handle this case
-    determined_framework = test_frameworks[0] if test_frameworks else "unknown"  # Default or handle appropriately
+    # Test results parsed from the build logs
     cumulative_test_results = {'passed': 0, 'failed': 0, 'skipped': 0, 'total': 0}
-    
-    # set to true to fetch logs and parse test results
     if config.get("fetch_test_parsing_results", False):
-        # Proceed with existing logic, including log fetching and parsing
-        build_log = get_github_actions_log(repo_full_name, run['id'], github_token)
-        
-        try:
-            with zipfile.ZipFile(io.BytesIO(build_log), 'r') as zip_ref:
-                for file_info in zip_ref.infolist():
-                    if file_info.filename.endswith('.txt'):
-                        with zip_ref.open(file_info) as log_file:
-                            for line in log_file:
-                                log_content = line.decode('utf-8').strip()  # Process line-by-line
-                                if log_content:
-                                    test_results = parse_test_results(determined_framework, log_content, build_language, framework_regex)
-                                    cumulative_test_results['passed'] += test_results['passed']
-                                    cumulative_test_results['failed'] += test_results['failed']
-                                    cumulative_test_results['skipped'] += test_results['skipped']
-                                    cumulative_test_results['total'] += test_results['total']
-                                    print(f"Parsed test results from {file_info.filename}: {test_results}")
-        except zipfile.BadZipFile:
-            print(f"Failed to unzip log file for build {run['id']}")
+        cumulative_test_results = enrichment['test_results']
         
     # Check if this build is PR-related
     if config.get("fetch_pull_request_details", False):
-        pr_details = fetch_pull_request_details(repo_full_name, commit_sha, github_token)
+        pr_details = enrichment['pr_details']
 
 
     head_commit_data = run.get('head_commit') or {}
@@ -441,7 +601,7 @@ def compile_build_info(run, repo_full_name, commit_data, sloc_initial, test_line
         build_info.update({
             'gh_job_id': jobs_ids,
             'total_jobs': job_count,
-            'job_details': json.dumps(job_details),  # Store job details as a JSON string
+            'job_details': job_details,  # Serialized by the output sink (JSON string in CSV, nested structs in Parquet)
             'tests_ran': tests_ran
         })
 
@@ -493,7 +653,8 @@ def main():
     projects_file = 'github_projects.csv'
     single_project = None
     parser = argparse.ArgumentParser()
-    parser.add_argument("-t", "--token", help="github token")
+    parser.add_argument("-t", "--token", action="append",
+                        help="github token; repeat the option or pass a comma-separated list to use several tokens")
     parser.add_argument("-p", "--projects", help="csv of projects list")
     parser.add_argument("-s", "--single-project", help="GitHub repository URL for single project analysis")
     parser.add_argument("-fd", "--from_date", help="since date")
@@ -501,7 +662,9 @@ def main():
     args = parser.parse_args()
 
     if args.token: 
-        github_token = args.token
+        # All tokens are pooled; each request uses the token with the most remaining quota
+        tokens = [token.strip() for value in args.token for token in value.split(',')]
+        github_token = TokenPool(tokens)
     if args.projects:
         projects_file = args.projects
     if args.single_project:
@@ -514,32 +677,50 @@ def main():
     projects = []
 
     config = load_config()
+
+    # Share one pooled keep-alive session across all GitHub API calls
+    configure_session(
+        pool_size=config.get("http_pool_size", DEFAULT_POOL_SIZE),
+        max_retries=config.get("http_max_retries", DEFAULT_MAX_RETRIES),
+    )
+    # Revalidate cached API responses with ETags on re-crawls (304s are not rate limited)
+    configure_response_cache(config.get("http_cache_dir"))
+    # Pace requests to the remaining rate-limit budget instead of fixed sleeps
+    configure_throttle(burst=config.get("throttle_burst", DEFAULT_BURST))
+    # Reuse git metrics of commits that were already analyzed (other workflows, previous runs)
+    configure_commit_cache(config.get("commit_cache_path"), config.get("commit_cache_max_entries", DEFAULT_MAX_ENTRIES))
+    # Read the local clones with the git binary or in-process with pygit2
+    configure_git_backend(config.get("git_backend", "subprocess"))
     
-    # Handle single project or projects file
-    if single_project:
-        # If a single project is specified, process only that
-        repo_full_name = single_project.split('/')[-2] + '/' + single_project.split('/')[-1]
-        get_builds_info(repo_full_name, github_token, output_csv, framework_regex, config)
-    else:
-        # If a CSV file is provided, process all projects in the file
-        with open(projects_file, 'r') as csvfile:
-            csv_reader = csv.reader(csvfile)
-            for row in csv_reader:
-                projects.append(row[0])
+    # Append-only output (CSV or Parquet); existing build ids are loaded once and kept in memory
+    build_sink = create_build_sink(config, output_csv)
+
+    with build_sink:
+        # Handle single project or projects file
+        if single_project:
+            # If a single project is specified, process only that
+            repo_full_name = single_project.split('/')[-2] + '/' + single_project.split('/')[-1]
+            get_builds_info(repo_full_name, github_token, build_sink, framework_regex, config, from_date, to_date)
+        else:
+            # If a CSV file is provided, process all projects in the file
+            with open(projects_file, 'r') as csvfile:
+                csv_reader = csv.reader(csvfile)
+                for row in csv_reader:
+                    projects.append(row[0])
         
-        # Process each project URL
-        for project in projects:
-            name = project.split('/')
-
-            # Check if the URL is valid before proceeding
-            if len(name) >= 2:
-                repo_full_name = f"{name[-2]}/{name[-1]}"
-                get_builds_info(repo_full_name, github_token, output_csv, framework_regex, config)
-            else:
-                print(name)
-                logging.error(f"Invalid URL format for project: {project}")
+            # Process each project URL
+            for project in projects:
+                name = project.split('/')
+
+                # Check if the URL is valid before proceeding
+                if len(name) >= 2:
+                    repo_full_name = f"{name[-2]}/{name[-1]}"
+                    get_builds_info(repo_full_name, github_token, build_sink, framework_regex, config, from_date, to_date)
+                else:
+                    print(name)
+                    logging.error(f"Invalid URL format for project: {project}")
     
-    logging.info("Build information processed and saved to output CSV.")
+    logging.info("Build information processed and saved to the output.")
 
 
 if __name__ == "__main__":
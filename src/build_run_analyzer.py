@@ -1,5 +1,6 @@
 import requests
 from repo_info_collector import get_workflow_ids
+from request_github import github_get, get_request
 from datetime import datetime, timezone, timedelta
 import time
 import math
@@ -7,30 +8,9 @@ import logging
 
 
 
-def get_request(url, token):
-    headers = {'Authorization': f'token {token}'}
-    attempt = 0
-    while attempt < 5:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 403 and 'X-RateLimit-Reset' in response.headers:
-            reset_time = datetime.fromtimestamp(int(response.headers['X-RateLimit-Reset']), timezone.utc)
-            sleep_time = (reset_time - datetime.now(timezone.utc)).total_seconds() + 10
-            logging.error(f"Rate limit exceeded, sleeping for {sleep_time} seconds. URL: {url}")
-            time.sleep(sleep_time)
-        else:
-            logging.error(
-                f"Failed to fetch data, status code: {response.status_code}, URL: {url}, Response: {response.text}")
-            time.sleep(math.pow(2, attempt) * 10)  # Exponential backoff
-        attempt += 1
-    return None
-
-
 def get_jobs_for_run_old(repo_full_name, run_id, token):
     url = f"https://api.github.com/repos/{repo_full_name}/actions/runs/{run_id}/jobs"
-    headers = {'Authorization': f'token {token}'}
-    jobs_response = requests.get(url, headers=headers).json()
+    jobs_response = github_get(url, token).json()
     jobs_ids = []
     if jobs_response and 'jobs' in jobs_response:
         for job in jobs_response['jobs']:
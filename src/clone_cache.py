@@ -0,0 +1,180 @@
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+
+DEFAULT_MAX_GB = 20
+# Only branches and tags are kept: GitHub's refs/pull/* would add every pull request's commits
+FETCH_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+# Marker file whose modification time records the last use of a mirror (LRU eviction)
+LAST_USED_MARKER = "ghaminer-last-used"
+
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def write_commit_graph(local_repo_path, git_path="git"):
+    """
+    Write git's commit-graph (with changed-path Bloom filters) and multi-pack-index for a clone.
+
+    The commit-graph stores the parents, dates and generation numbers of all commits,
+    which speeds up history walks (rev-list --count, commit ranges, --since filters),
+    and the Bloom filters let path-limited `git log -- <path>` skip commits that did
+    not touch the path. The layers are written incrementally (--split), and the
+    repository is configured so later fetches keep the commit-graph up to date.
+    """
+    def run_git(*args):
+        return subprocess.run([git_path, "-C", local_repo_path, *args], capture_output=True, text=True,
+                              encoding="utf-8", errors="replace")
+
+    commands = [
+        ["config", "core.commitGraph", "true"],
+        ["config", "fetch.writeCommitGraph", "true"],
+        ["config", "core.multiPackIndex", "true"],
+        ["commit-graph", "write", "--reachable", "--changed-paths", "--split"],
+    ]
+    # A multi-pack-index needs at least one pack (a repository with only loose objects has none)
+    if "packs: 0" not in run_git("count-objects", "-v").stdout.splitlines():
+        commands.append(["multi-pack-index", "write"])
+
+    for command in commands:
+        result = run_git(*command)
+        if result.returncode != 0:
+            logging.warning(f"git {' '.join(command)} failed for {local_repo_path}: {result.stderr.strip()}")
+            return False
+    return True
+
+
+class MirrorCache:
+    """
+    Persistent cache of bare mirror clones, one per repository.
+
+    The first crawl of a repository runs `git clone --bare`; later crawls only
+    `git fetch --prune` the branches and tags of the mirror, so the history is
+    downloaded once. Unlike `git clone --mirror`, the pull request refs of GitHub
+    (refs/pull/*/head and refs/pull/*/merge) are not fetched. A mirror can
+    be blobless (`--filter=blob:none`), in which case file contents are downloaded
+    on demand. When the cache grows over its disk budget, the least recently used
+    mirrors are deleted. After every clone or fetch, the commit-graph and
+    multi-pack-index of the mirror are updated (see write_commit_graph).
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_GB * 1024 ** 3, commit_graph=True):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.commit_graph = commit_graph
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.git_path = shutil.which("git") or r"C:\Program Files\Git\cmd\git.exe"  # Find git
+
+    def mirror_path(self, repo_full_name):
+        return os.path.join(self.cache_dir, repo_full_name.replace("/", "__") + ".git")
+
+    def _run_git(self, *args):
+        return subprocess.run([self.git_path, *args], capture_output=True, text=True, encoding="utf-8", errors="replace")
+
+    def _configure_refspecs(self, path):
+        """Fetch only branches and tags, also in mirrors made by `git clone --mirror`."""
+        self._run_git("-C", path, "config", "--unset", "remote.origin.mirror")
+        self._run_git("-C", path, "config", "--replace-all", "remote.origin.fetch", FETCH_REFSPECS[0])
+        for refspec in FETCH_REFSPECS[1:]:
+            self._run_git("-C", path, "config", "--add", "remote.origin.fetch", refspec)
+
+        refs = self._run_git("-C", path, "for-each-ref", "--format=%(refname)").stdout.split()
+        stale_refs = [ref for ref in refs if not ref.startswith(("refs/heads/", "refs/tags/"))]
+        if stale_refs:
+            subprocess.run([self.git_path, "-C", path, "update-ref", "--stdin"], capture_output=True, text=True,
+                           input="".join(f"delete {ref}\n" for ref in stale_refs))
+
+    def _is_mirror(self, path):
+        result = self._run_git("-C", path, "config", "--get", "remote.origin.mirror")
+        return result.returncode == 0 and result.stdout.strip() == "true"
+
+    def _is_blobless(self, path):
+        result = self._run_git("-C", path, "config", "--get", "remote.origin.partialclonefilter")
+        return result.returncode == 0 and bool(result.stdout.strip())
+
+    def get_mirror(self, repo_full_name, blobless=False):
+        """
+        Return the path of an up-to-date bare mirror of the repository, or None if it cannot be cloned.
+
+        A blobless mirror is replaced by a full one when `blobless` is False.
+        """
+        repo_url = f"https://github.com/{repo_full_name}.git"
+        path = self.mirror_path(repo_full_name)
+
+        with self._lock:
+            if os.path.exists(path) and not blobless and self._is_blobless(path):
+                logging.info(f"Replacing the blobless mirror of {repo_full_name} with a full mirror.")
+                shutil.rmtree(path, ignore_errors=True)
+
+            if os.path.exists(path):
+                print(f"Updating mirror: {path}")
+                if self._is_mirror(path):
+                    self._configure_refspecs(path)  # Made by an older version with `git clone --mirror`
+                result = self._run_git("-C", path, "fetch", "--prune", "origin")
+                if result.returncode != 0:
+                    logging.error(f"Failed to update the mirror of {repo_full_name}: {result.stderr.strip()}")
+            else:
+                print(f"Cloning mirror into: {path}")
+                clone_args = ["clone", "--bare"]
+                if blobless:
+                    clone_args.append("--filter=blob:none")
+                result = self._run_git(*clone_args, repo_url, path)
+                if result.returncode != 0:
+                    logging.error(f"Error cloning repo: {result.stderr.strip()}")
+                    shutil.rmtree(path, ignore_errors=True)
+                    return None
+                self._configure_refspecs(path)  # A bare clone has no fetch refspec
+
+            if self.commit_graph:
+                write_commit_graph(path, self.git_path)
+            self._touch(path)
+            self._evict(keep=path)
+
+        return path
+
+    @staticmethod
+    def _touch(path):
+        marker = os.path.join(path, LAST_USED_MARKER)
+        with open(marker, "a"):
+            pass
+        os.utime(marker, None)
+
+    @staticmethod
+    def _last_used(path):
+        try:
+            return os.path.getmtime(os.path.join(path, LAST_USED_MARKER))
+        except OSError:
+            return 0
+
+    def _evict(self, keep=None):
+        """Delete the least recently used mirrors (never `keep`) until the cache fits in the disk budget."""
+        if not self.max_bytes:
+            return
+
+        mirrors = [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+            if name.endswith(".git") and os.path.isdir(os.path.join(self.cache_dir, name))
+        ]
+        sizes = {path: _directory_size(path) for path in mirrors}
+        total = sum(sizes.values())
+
+        for path in sorted(mirrors, key=self._last_used):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+            logging.info(f"Evicted mirror {path} ({sizes[path] / 1024 ** 2:.0f} MB) from the clone cache.")
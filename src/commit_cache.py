@@ -0,0 +1,89 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_MAX_ENTRIES = 200000
+
+
+class CommitMetricsCache:
+    """
+    Persistent memo cache of git-derived metrics keyed by commit SHA.
+
+    Values are stored as JSON in a SQLite file, under a (kind, sha) key where kind
+    names the metric (e.g. 'commit_data'). The cache is shared by every workflow of
+    a repository and survives collector restarts, so a head commit built by several
+    workflows is analyzed once. When it holds more than `max_entries` values, the
+    least recently used ones are evicted.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._puts_since_eviction = 0
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS commit_metrics (
+                    kind TEXT NOT NULL,
+                    sha TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (kind, sha)
+                )
+            """)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_commit_metrics_last_used ON commit_metrics (last_used)")
+
+    def get(self, kind, sha):
+        """Return the cached value of `kind` for the commit, or None."""
+        try:
+            with self._lock, self._connection:
+                row = self._connection.execute(
+                    "SELECT value FROM commit_metrics WHERE kind = ? AND sha = ?", (kind, sha)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._connection.execute(
+                    "UPDATE commit_metrics SET last_used = ? WHERE kind = ? AND sha = ?", (time.time(), kind, sha)
+                )
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logging.warning(f"Commit cache lookup failed for {kind} {sha}: {e}")
+            return None
+
+    def put(self, kind, sha, value):
+        """Store the value of `kind` for the commit (must be JSON serializable)."""
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT INTO commit_metrics (kind, sha, value, last_used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (kind, sha) DO UPDATE SET value = excluded.value, last_used = excluded.last_used",
+                    (kind, sha, json.dumps(value), time.time()),
+                )
+                self._puts_since_eviction += 1
+                # Check the size every few hundred writes rather than on every put
+                if self._puts_since_eviction >= 256:
+                    self._puts_since_eviction = 0
+                    self._evict()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.warning(f"Failed to cache {kind} for commit {sha}: {e}")
+
+    def _evict(self):
+        count = self._connection.execute("SELECT COUNT(*) FROM commit_metrics").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        self._connection.execute(
+            "DELETE FROM commit_metrics WHERE rowid IN "
+            "(SELECT rowid FROM commit_metrics ORDER BY last_used LIMIT ?)", (excess,)
+        )
+        logging.info(f"Evicted {excess} least recently used entries from the commit cache.")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
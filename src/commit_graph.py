@@ -0,0 +1,135 @@
+import logging
+
+import numpy as np
+
+
+class CommitGraph:
+    """
+    Commit DAG of a repository held in NumPy arrays, built from a single traversal
+    of all refs by the git backend (`git rev-list --all --parents` or pygit2).
+
+    Commits are numbered 0..n-1 (`ids` maps a SHA to its number). Parents are stored
+    in CSR form (`parent_offsets`, `parent_ids`) next to the committer timestamps and
+    author ids, so commit counts, ancestry and time-window questions are answered
+    from the arrays instead of new git invocations. `head_mask` flags the commits
+    reachable from HEAD, i.e. the history `git log` walks by default.
+    """
+
+    def __init__(self, backend):
+        self.local_repo_path = backend.local_repo_path
+        self.shas = []
+        self.ids = {}
+        self.authors = []
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.author_ids = np.empty(0, dtype=np.int64)
+        self.parent_offsets = np.zeros(1, dtype=np.int64)
+        self.parent_ids = np.empty(0, dtype=np.int64)
+        self.head_mask = np.zeros(0, dtype=bool)
+        self._ancestor_counts = {}
+        self._build(backend)
+
+    def __len__(self):
+        return len(self.shas)
+
+    def __contains__(self, commit_sha):
+        return commit_sha in self.ids
+
+    def _build(self, backend):
+        commits = backend.iter_commits()
+        if commits is None:
+            logging.error(f"Failed to load the commit graph of {self.local_repo_path}")
+            return
+
+        parent_shas = []
+        timestamps = []
+        author_ids = []
+        author_index = {}
+        for commit_sha, parents, timestamp, author in commits:
+            self.ids[commit_sha] = len(self.shas)
+            self.shas.append(commit_sha)
+            parent_shas.append(parents)
+            timestamps.append(timestamp)
+            author_ids.append(author_index.setdefault(author, len(author_index)))
+
+        self.authors = list(author_index)
+        self.timestamps = np.array(timestamps, dtype=np.int64)
+        self.author_ids = np.array(author_ids, dtype=np.int64)
+
+        # Parents outside the graph (shallow or partial history) are dropped
+        parent_lists = [[self.ids[sha] for sha in parents if sha in self.ids] for parents in parent_shas]
+        self.parent_offsets = np.zeros(len(parent_lists) + 1, dtype=np.int64)
+        self.parent_offsets[1:] = np.cumsum([len(parents) for parents in parent_lists])
+        self.parent_ids = np.array([pid for parents in parent_lists for pid in parents], dtype=np.int64)
+
+        head = backend.resolve("HEAD^{commit}")
+        self.head_mask = self.ancestor_mask(head) if head in self.ids else np.zeros(len(self.shas), dtype=bool)
+
+        logging.info(f"Commit graph of {self.local_repo_path}: {len(self.shas)} commits, {len(self.authors)} authors.")
+
+    def parents(self, commit_id):
+        return self.parent_ids[self.parent_offsets[commit_id]:self.parent_offsets[commit_id + 1]]
+
+    def ancestor_mask(self, commit_sha):
+        """Boolean mask of the commits reachable from `commit_sha` (itself included)."""
+        mask = np.zeros(len(self.shas), dtype=bool)
+        commit_id = self.ids.get(commit_sha)
+        if commit_id is None:
+            return mask
+
+        offsets = self.parent_offsets.tolist()
+        parent_ids = self.parent_ids.tolist()
+        visited = bytearray(len(self.shas))
+        stack = [commit_id]
+        visited[commit_id] = 1
+        while stack:
+            current = stack.pop()
+            for parent in parent_ids[offsets[current]:offsets[current + 1]]:
+                if not visited[parent]:
+                    visited[parent] = 1
+                    stack.append(parent)
+        mask[np.frombuffer(bytes(visited), dtype=np.uint8).astype(bool)] = True
+        return mask
+
+    def count_ancestors(self, commit_sha):
+        """
+        Number of commits reachable from `commit_sha`, itself included (`git rev-list --count`),
+        or None if the commit is not in the graph.
+
+        A commit with a single parent has exactly one more ancestor than its parent, so
+        counts are memoized along first-parent chains; only merge commits need a walk.
+        """
+        commit_id = self.ids.get(commit_sha)
+        if commit_id is None:
+            return None
+
+        # Go down the single-parent chain until a known count, a root or a merge commit
+        chain = []
+        current = commit_id
+        while current not in self._ancestor_counts:
+            parents = self.parents(current)
+            if len(parents) != 1:
+                break
+            chain.append(current)
+            current = int(parents[0])
+
+        if current not in self._ancestor_counts:
+            if len(self.parents(current)) == 0:
+                self._ancestor_counts[current] = 1
+            else:
+                self._ancestor_counts[current] = int(self.ancestor_mask(self.shas[current]).sum())
+
+        count = self._ancestor_counts[current]
+        for chain_id in reversed(chain):
+            count += 1
+            self._ancestor_counts[chain_id] = count
+        return self._ancestor_counts[commit_id]
+
+    def commits_between(self, since, until, mask=None):
+        """
+        SHAs of the commits with since <= committer timestamp <= until, newest first,
+        among the commits of `mask` (the history of HEAD by default).
+        """
+        mask = self.head_mask if mask is None else mask
+        selected = np.flatnonzero(mask & (self.timestamps >= since) & (self.timestamps <= until))
+        selected = selected[np.argsort(-self.timestamps[selected], kind="stable")]
+        return [self.shas[commit_id] for commit_id in selected]
@@ -1,13 +1,67 @@
 import requests
 import logging
+import bisect
 from datetime import datetime, timezone, timedelta
 import os
 from file_indicators import is_production_file , is_test_file
+from commit_cache import CommitMetricsCache, DEFAULT_MAX_ENTRIES
+from commit_graph import CommitGraph
+from git_backend import create_git_backend, SUBPROCESS_BACKEND
+from clone_cache import write_commit_graph
 import subprocess
 import json
 import shutil
 import platform
 import stat
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Upper bound of the commits attributed to one run in the range-based commit window
+MAX_RANGE_COMMITS = 1000
+
+_commit_cache = None
+
+
+def configure_commit_cache(cache_path, max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Memoize per-commit git metrics in a persistent SQLite cache stored at `cache_path`.
+    Pass None (or an empty string) to disable caching.
+    """
+    global _commit_cache
+    if _commit_cache is not None:
+        _commit_cache.close()
+    _commit_cache = CommitMetricsCache(cache_path, max_entries) if cache_path else None
+    return _commit_cache
+
+
+def _memoized(kind, commit_sha, compute, is_valid=bool):
+    """Return the cached `kind` metric of a commit, computing and caching it on a miss (valid results only)."""
+    if _commit_cache is None:
+        return compute()
+    value = _commit_cache.get(kind, commit_sha)
+    if value is not None:
+        return value
+    value = compute()
+    if is_valid(value):
+        _commit_cache.put(kind, commit_sha, value)
+    return value
+
+
+def get_cached_commit_data(commit_sha, local_repo_path):
+    """fetch_full_commit_data_local through the commit cache."""
+    def compute():
+        data = fetch_full_commit_data_local(commit_sha, local_repo_path)
+        if data:
+            data = dict(data, file_types=sorted(data['file_types']))  # JSON has no sets
+        return data
+
+    data = _memoized("commit_data", commit_sha, compute)
+    if data:
+        data = dict(data, file_types=set(data['file_types']))
+    return data
+
 
 def ensure_executable(path):
     if platform.system() != "Windows":
@@ -60,6 +114,9 @@ def clone_repo_locally(repo_url, base_path):
     except subprocess.CalledProcessError as e:
         logging.error(f"Failed to fetch all commits for {repo_name}: {e}")
 
+    # Commit-graph and multi-pack-index speed up the history walks of the analysis
+    write_commit_graph(local_repo_path, git_path)
+
     return local_repo_path  # Return the path so it can be used later
 
 
@@ -88,46 +145,119 @@ def is_documentation_file(file_path):
 
 
 
+class BlobLineCache:
+    """
+    Line counts of the blobs of a repository, keyed by blob SHA.
+
+    scc code lines depend on the language, which scc infers from the file name, so
+    they are keyed by (blob SHA, file name); total line counts only depend on the
+    content. Consecutive commits share most of their blobs, so only the blobs
+    changed since the previously analyzed commits have to be counted.
+    """
+
+    def __init__(self):
+        self.code_lines = {}
+        self.total_lines = {}
+        self._lock = threading.Lock()
+
+
+_blob_line_caches = {}
+_blob_line_caches_lock = threading.Lock()
+
+
+def get_blob_line_cache(local_repo_path):
+    key = os.path.abspath(local_repo_path)
+    with _blob_line_caches_lock:
+        cache = _blob_line_caches.get(key)
+        if cache is None:
+            cache = _blob_line_caches[key] = BlobLineCache()
+        return cache
+
+
+def list_tree_blobs(local_repo_path, revision):
+    """
+    Return [(blob sha, path)] of the regular files in the tree of `revision`
+    (symlinks and submodules are skipped), or None on error.
+    """
+    return get_git_backend(local_repo_path).list_tree_blobs(revision)
+
+
+def count_code_lines_with_scc(local_repo_path, blobs):
+    """
+    Run scc once over the given blobs and return {(blob sha, file name): code lines}.
+
+    Each blob is written under its file name to its own directory of a temporary folder,
+    so scc detects the same language as in the repository. Files scc does not recognize count 0.
+    """
+    import tempfile
+
+    SCC_PATH = get_scc_path()
+    ensure_executable(SCC_PATH)
+    backend = get_git_backend(local_repo_path)
+
+    counts = {}
+    with tempfile.TemporaryDirectory(prefix="ghaminer-blobs-") as tmp_dir:
+        locations = {}
+        for idx, (blob_sha, file_name) in enumerate(blobs):
+            counts[(blob_sha, file_name)] = 0
+            content = backend.read_blob(blob_sha)
+            if content is None:
+                continue
+            blob_dir = os.path.join(tmp_dir, str(idx))
+            os.makedirs(blob_dir)
+            location = os.path.join(blob_dir, file_name)
+            with open(location, "wb") as file:
+                file.write(content)
+            locations[os.path.normpath(location)] = (blob_sha, file_name)
+
+        result = subprocess.run(
+            [SCC_PATH, "--no-cocomo", "--by-file", "--format", "json", tmp_dir],
+            capture_output=True, text=True, encoding="utf-8", errors="replace"
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"scc execution failed: {result.stderr}")
+
+        for language in json.loads(result.stdout) or []:
+            for file_entry in language.get("Files") or []:
+                key = locations.get(os.path.normpath(file_entry.get("Location", "")))
+                if key is not None:
+                    counts[key] = file_entry.get("Code", 0)
+
+    return counts
+
+
 def calculate_sloc_and_test_lines(local_repo_path, commit_sha=None, timestamp=None):
     """
     Calculates SLOC and test lines for the repository at a specific commit or timestamp.
 
+    The files are read from the commit tree, without checking the commit out. Line
+    counts are cached per blob, so scc only runs on the blobs that were not counted
+    for a previous commit.
+
     Args:
         local_repo_path (str): Path to the local repository.
-        commit_sha (str): Specific commit to checkout. If None, use the latest state.
+        commit_sha (str): Specific commit to analyze. If None, use the latest state.
         timestamp (str): If commit_sha is None, use the latest state at this timestamp.
 
     Returns:
         tuple: (SLOC, Test lines)
     """
-    import json
     from datetime import datetime
 
-    SCC_PATH = get_scc_path()
-    ensure_executable(SCC_PATH)
-    
     # Ensure repository path exists
     if not os.path.exists(local_repo_path):
         logging.error(f"Repository path not found: {local_repo_path}")
         return None, None
 
-    # Flag to track if checkout was successful
-    checkout_successful = False
-
-    # Attempt to checkout the specific commit if provided
+    # Use the specific commit if it is available locally
+    revision = None
     if commit_sha:
-        try:
-            print(f"Attempting to checkout to commit: {commit_sha}")
-            subprocess.run(["git", "-C", local_repo_path, "checkout", commit_sha],
-                           check=True, capture_output=True, text=True)
-            checkout_successful = True
-            print(f"Checked out to commit: {commit_sha}")
+        revision = get_git_backend(local_repo_path).resolve(f"{commit_sha}^{{commit}}")
+        if revision is None:
+            logging.warning(f"Commit {commit_sha} is not available locally")
 
-        except subprocess.CalledProcessError as e:
-            logging.warning(f"Failed to checkout to commit {commit_sha}: {e}")
-
-    # If checkout failed or commit not provided, use timestamp to find the commit
-    if not checkout_successful and timestamp:
+    # If the commit is missing or not provided, use timestamp to find the commit
+    if revision is None and timestamp:
         try:
             print(f"Finding commit at timestamp: {timestamp}")
             git_timestamp = datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
@@ -137,147 +267,142 @@ def calculate_sloc_and_test_lines(local_repo_path, commit_sha=None, timestamp=No
             )
 
             if result.returncode == 0 and result.stdout.strip():
-                commit_sha = result.stdout.strip()
-                print(f"Found commit at timestamp: {commit_sha}")
-
-                # Try to checkout to the found commit
-                try:
-                    subprocess.run(["git", "-C", local_repo_path, "checkout", commit_sha],
-                                   check=True, capture_output=True, text=True)
-                    checkout_successful = True
-                    print(f"Checked out to commit at timestamp: {commit_sha}")
-
-                except subprocess.CalledProcessError as e:
-                    logging.warning(f"Failed to checkout to commit at timestamp {timestamp}: {e}")
+                revision = result.stdout.strip()
+                print(f"Found commit at timestamp: {revision}")
 
         except Exception as e:
             logging.error(f"Error finding commit by timestamp: {e}")
 
-    # If both commit and timestamp failed, log a warning
-    if not checkout_successful:
+    if revision is None:
         print(f"Proceeding with the latest state of the repo at {local_repo_path}.")
+        revision = "HEAD"
 
-    # Calculate SLOC and test lines using scc
-    try:
-        print(f"Running scc on: {local_repo_path}")
-        result = subprocess.run(
-            [SCC_PATH, "--no-cocomo", "--format", "json", local_repo_path],
-            capture_output=True, text=True, encoding="utf-8", errors="replace"
-        )
+    def compute():
+        try:
+            blobs = list_tree_blobs(local_repo_path, revision)
+            if blobs is None:
+                return None
+
+            cache = get_blob_line_cache(local_repo_path)
+            with cache._lock:
+                # Count the code lines of the blobs that were not seen in a previous commit
+                missing = {(blob_sha, os.path.basename(path)) for blob_sha, path in blobs} - cache.code_lines.keys()
+                if missing:
+                    print(f"Running scc on {len(missing)} new blob(s) of {revision}")
+                    cache.code_lines.update(count_code_lines_with_scc(local_repo_path, sorted(missing)))
+                sloc = sum(cache.code_lines[(blob_sha, os.path.basename(path))] for blob_sha, path in blobs)
+
+                # Count the lines of the test files, streamed from the object store
+                test_lines = 0
+                backend = get_git_backend(local_repo_path)
+                for blob_sha, path in blobs:
+                    if not is_test_file(path):
+                        continue
+                    if blob_sha not in cache.total_lines:
+                        cache.total_lines[blob_sha] = backend.count_lines(blob_sha) or 0
+                    test_lines += cache.total_lines[blob_sha]
+
+            print(f"SLOC: {sloc}, Test Lines: {test_lines}")
+            return [sloc, test_lines]
 
-        if result.returncode != 0:
-            logging.error(f"scc execution failed: {result.stderr}")
-            return None, None
+        except Exception as e:
+            logging.error(f"Error running scc: {e}")
+            return None
 
-        # Parse the JSON output
-        loc_data = json.loads(result.stdout)
-        sloc = sum(entry["Code"] for entry in loc_data)
+    # The tree of a commit never changes, so its SLOC is memoized by SHA (not the HEAD fallback)
+    if revision == "HEAD":
+        result = compute()
+    else:
+        result = _memoized("sloc", revision, compute, is_valid=lambda value: value is not None)
+    return tuple(result) if result else (None, None)
 
-        # Identify potential test files
-        print("Identifying potential test files...")
-        result = subprocess.run(
-            ["git", "-C", local_repo_path, "ls-files"],
-            capture_output=True, text=True
-        )
 
-        test_lines = 0
-
-        if result.returncode == 0:
-            files_in_repo = result.stdout.strip().split("\n")
-            
-            for file_path in files_in_repo:
-                # Identify test files based on name
-                if "test" in file_path.lower() or "spec" in file_path.lower():
-                    full_path = os.path.join(local_repo_path, file_path)
-                    
-                    # Check if file exists before counting lines
-                    if os.path.exists(full_path):
-                        try:
-                            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                                lines = f.readlines()
-                                test_lines += len(lines)
-                            print(f"Test file: {file_path} - {len(lines)} lines")
-                        except Exception as e:
-                            logging.warning(f"Error reading file {file_path}: {e}")
-
-        print(f"SLOC: {sloc}, Test Lines: {test_lines}")
-        return sloc, test_lines
+_git_backend_name = SUBPROCESS_BACKEND
+_git_backends = {}
+_git_backends_lock = threading.Lock()
 
-    except Exception as e:
-        logging.error(f"Error running scc: {e}")
-        return None, None
 
-    finally:
-        # Checkout back to the main branch to avoid repo lock issues
-        try:
-            subprocess.run(["git", "-C", local_repo_path, "checkout", "main"], check=True,
-                           capture_output=True, text=True)
-        except subprocess.CalledProcessError:
-            pass
+def configure_git_backend(backend_name):
+    """Select the git backend used for the local analysis: 'subprocess' (git binary) or 'pygit2'."""
+    global _git_backend_name
+    _git_backend_name = backend_name or SUBPROCESS_BACKEND
 
 
+def get_git_backend(local_repo_path):
+    """Return the shared git backend of a repository, creating it on first use."""
+    key = os.path.abspath(local_repo_path)
+    with _git_backends_lock:
+        backend = _git_backends.get(key)
+        if backend is None:
+            backend = _git_backends[key] = create_git_backend(key, _git_backend_name)
+        return backend
 
 
-def get_file_line_count(commit_sha, file_path, local_repo_path):
-    """
-    Get the total number of lines in a file at a specific commit SHA.
-    Returns the line count or None if the file doesn't exist at that commit.
-    """
-    try:
-        result = subprocess.run(
-            ["git", "-C", local_repo_path, "show", f"{commit_sha}:{file_path}"],
-            capture_output=True, text=True, encoding="utf-8", errors="replace", check=True
-        )
-        return len(result.stdout.splitlines())  # Count total lines in the file
-    except subprocess.CalledProcessError:
-        return None  # File does not exist at this commit
+def close_git_backends(local_repo_path=None):
+    """Close the git backend of one repository, or of all repositories when no path is given."""
+    with _git_backends_lock:
+        if local_repo_path is None:
+            backends = list(_git_backends.values())
+            _git_backends.clear()
+        else:
+            backend = _git_backends.pop(os.path.abspath(local_repo_path), None)
+            backends = [backend] if backend else []
+    for backend in backends:
+        backend.close()
+
 
-def get_last_commit_containing_file(file_path, commit_sha, local_repo_path):
+def fetch_missing_commits(local_repo_path, commit_shas):
     """
-    Find the last commit before `commit_sha` where `file_path` existed.
+    Make sure the given commits are available locally before they are analyzed.
+
+    Presence is checked through the git backend (cat-file --batch-check or pygit2), and
+    only the missing commits are downloaded, with a single `git fetch origin <sha>...`.
+    If that fetch fails (e.g. one commit is no longer available on GitHub), the missing
+    commits are fetched one by one so the others are still retrieved.
+
+    Returns:
+        list: The commits that are still missing.
     """
-    try:
-        result = subprocess.run(
-            ["git", "-C", local_repo_path, "log", "--format=%H", "--", file_path],
-            capture_output=True, text=True, encoding="utf-8", errors="replace", check=True
-        )
-        commits = result.stdout.strip().split("\n")
-        return commits[1] if len(commits) > 1 else None  # Get the last known commit before deletion
-    except subprocess.CalledProcessError:
-        return None  # File has no prior history
+    backend = get_git_backend(local_repo_path)
+    missing = [sha for sha in dict.fromkeys(commit_shas) if sha and backend.resolve(f"{sha}^{{commit}}") is None]
+    if not missing:
+        return []
+
+    logging.info(f"Fetching {len(missing)} missing commit(s) into {local_repo_path}")
+    result = subprocess.run(
+        ["git", "-C", local_repo_path, "fetch", "--no-tags", "origin", *missing],
+        capture_output=True, text=True, encoding="utf-8", errors="replace"
+    )
+    if result.returncode != 0:
+        logging.warning(f"Batched fetch of {len(missing)} commit(s) failed, fetching them one by one: {result.stderr.strip()}")
+        for sha in missing:
+            result = subprocess.run(
+                ["git", "-C", local_repo_path, "fetch", "--no-tags", "origin", sha],
+                capture_output=True, text=True, encoding="utf-8", errors="replace"
+            )
+            if result.returncode != 0:
+                logging.warning(f"Failed to fetch commit {sha}: {result.stderr.strip()}")
+
+    return [sha for sha in missing if backend.resolve(f"{sha}^{{commit}}") is None]
+
 
 def fetch_full_commit_data_local(commit_sha, local_repo_path):
-    """Fetch detailed commit data using local Git, ensuring the commit exists before retrieving details."""
+    """Fetch detailed commit data using local Git."""
     try:
         if not os.path.exists(local_repo_path):
             logging.error(f"Repository path does not exist: {local_repo_path}")
             return {}
 
-        # **Ensure the commit exists locally by fetching it explicitly**
-        fetch_result = subprocess.run(
-            ["git", "-C", local_repo_path, "fetch", "origin", commit_sha],
-            capture_output=True, text=True, encoding="utf-8", errors="replace"
-        )
-        if fetch_result.returncode != 0:
-            logging.warning(f"Failed to fetch commit {commit_sha}: {fetch_result.stderr.strip()}")
-
-        # **Try to show commit details**
-        result = subprocess.run(
-            ["git", "-C", local_repo_path, "show", "--numstat", "--pretty=format:%an", commit_sha],
-            capture_output=True, text=True, encoding="utf-8", errors="replace"
-        )
-
-        if result.returncode != 0:
-            logging.error(f"Failed to fetch commit details for {commit_sha}: {result.stderr.strip()}")
-            return {}
+        # Missing commits are fetched beforehand for a whole page (see fetch_missing_commits)
 
-        output = result.stdout.strip().split("\n")
-        if not output:
-            logging.error(f"Commit {commit_sha} has no valid output from git show")
+        # **Author, status letter and line counts of every file, from the git backend**
+        diff_stats = get_git_backend(local_repo_path).diff_stats(commit_sha)
+        if diff_stats is None:
             return {}
 
-        # **Extract commit author**
-        author_name = output[0].strip() if output else "Unknown"
+        # **Extract commit author and file changes**
+        author_name, changes = diff_stats
+        author_name = author_name or "Unknown"
         # **Initialize commit metadata**
         total_added = total_removed = tests_added = tests_removed = 0
         src_files = doc_files = other_files = 0
@@ -292,37 +417,15 @@ def fetch_full_commit_data_local(commit_sha, local_repo_path):
         unique_files_modified = set()
 
         # **Process file changes**
-        for line in output[1:]:  # Skip author line
-            parts = line.split("\t")
-            if len(parts) != 3:
-                continue  # Skip malformed lines
-
-            added_lines, removed_lines, filename = parts
-            added_lines = int(added_lines) if added_lines.isdigit() else 0
-            removed_lines = int(removed_lines) if removed_lines.isdigit() else 0
-
+        for status, filename, added_lines, removed_lines in changes:
             # **Track total added/removed lines**
             total_added += added_lines
             total_removed += removed_lines
 
-            # **Get previous commit SHA (parent of current commit)**
-            parent_commit_result = subprocess.run(
-                ["git", "-C", local_repo_path, "rev-parse", f"{commit_sha}^"],
-                capture_output=True, text=True, encoding="utf-8", errors="replace"
-            )
-            parent_commit = parent_commit_result.stdout.strip() if parent_commit_result.returncode == 0 else None
-
-            # **Determine file status more accurately**
-            prev_line_count = get_file_line_count(parent_commit, filename, local_repo_path) if parent_commit else None
-            current_line_count = get_file_line_count(commit_sha, filename, local_repo_path)
-
-            if prev_line_count is None and removed_lines > 0:
-                last_known_commit = get_last_commit_containing_file(filename, commit_sha, local_repo_path)
-                prev_line_count = get_file_line_count(last_known_commit, filename, local_repo_path)
-
-            if prev_line_count is None and current_line_count is not None:
+            # **File status comes straight from diff-tree (renames count as modifications)**
+            if status in ("A", "C"):
                 unique_files_added.add(filename)
-            elif prev_line_count is not None and current_line_count is None:
+            elif status == "D":
                 unique_files_deleted.add(filename)
             else:
                 unique_files_modified.add(filename)
@@ -386,6 +489,117 @@ def fetch_full_commit_data_local(commit_sha, local_repo_path):
 
 from datetime import datetime, timedelta
 
+def _is_object_id(value):
+    return len(value) in (40, 64) and all(c in "0123456789abcdef" for c in value)
+
+
+class FileTouchIndex:
+    """
+    Index of the commits touching each path, built from a single `git log --name-only -c` pass.
+    With -c, merge commits list the paths that differ from all their parents, i.e. the
+    merges a path-limited `git log -- <path>` shows.
+
+    Each path maps to the commit timestamps (sorted) and the matching commit ids, so
+    counting the commits that touched a set of files within a time window is one
+    pair of binary searches per file.
+    """
+
+    def __init__(self, local_repo_path, rev="HEAD"):
+        self.local_repo_path = local_repo_path
+        self._timestamps = {}
+        self._commits = {}
+        self._build(rev)
+
+    def _build(self, rev):
+        result = subprocess.run(
+            ["git", "-C", self.local_repo_path, "log", "--no-renames", "--name-only", "-c", "-z",
+             "--format=%x00%H%x00%ct", rev],
+            capture_output=True, text=True, encoding="utf-8", errors="replace"
+        )
+        if result.returncode != 0:
+            logging.error(f"Failed to build the file touch index of {self.local_repo_path}: {result.stderr.strip()}")
+            return
+
+        # Records are "\0<sha>\0<timestamp>" followed by the NUL-separated paths of the commit
+        touches = {}
+        tokens = result.stdout.split("\0")
+        idx = 0
+        commit_sha = timestamp = None
+        while idx < len(tokens):
+            token = tokens[idx].strip("\n")
+            if not token:
+                # An empty token starts a new commit record
+                if idx + 2 < len(tokens) and _is_object_id(tokens[idx + 1].strip("\n")):
+                    commit_sha = tokens[idx + 1].strip("\n")
+                    timestamp = int(tokens[idx + 2])
+                    idx += 3
+                    continue
+                idx += 1
+                continue
+            if commit_sha is not None:
+                touches.setdefault(token, []).append((timestamp, commit_sha))
+            idx += 1
+
+        for path, entries in touches.items():
+            entries.sort()
+            self._timestamps[path] = [timestamp for timestamp, _ in entries]
+            self._commits[path] = [sha for _, sha in entries]
+
+        logging.info(f"File touch index of {self.local_repo_path}: {len(self._timestamps)} paths.")
+
+    def commits_touching(self, file_paths, since, until):
+        """Return the set of commit ids that touched any of `file_paths` with since <= timestamp <= until."""
+        commits = set()
+        for file_path in file_paths:
+            timestamps = self._timestamps.get(file_path)
+            if not timestamps:
+                continue
+            lo = bisect.bisect_left(timestamps, since)
+            hi = bisect.bisect_right(timestamps, until)
+            commits.update(self._commits[file_path][lo:hi])
+        return commits
+
+
+_file_touch_indexes = {}
+_file_touch_indexes_lock = threading.Lock()
+
+
+def get_file_touch_index(local_repo_path):
+    """Return the FileTouchIndex of a repository, built on first use and reused for every run."""
+    key = os.path.abspath(local_repo_path)
+    with _file_touch_indexes_lock:
+        index = _file_touch_indexes.get(key)
+        if index is None:
+            index = _file_touch_indexes[key] = FileTouchIndex(key)
+        return index
+
+
+def release_repo_resources(local_repo_path):
+    """Close the git backend and drop the indexes of a repository (before deleting the clone)."""
+    close_git_backends(local_repo_path)
+    with _file_touch_indexes_lock:
+        _file_touch_indexes.pop(os.path.abspath(local_repo_path), None)
+    with _committer_timelines_lock:
+        _committer_timelines.pop(os.path.abspath(local_repo_path), None)
+    with _blob_line_caches_lock:
+        _blob_line_caches.pop(os.path.abspath(local_repo_path), None)
+    with _commit_graphs_lock:
+        _commit_graphs.pop(os.path.abspath(local_repo_path), None)
+
+
+def get_commit_files(local_repo_path, commit_sha):
+    """Return the paths changed by a commit (without rename detection), or None on error."""
+    result = subprocess.run(
+        ["git", "-C", local_repo_path, "diff-tree", "-r", "--root", "--no-renames", "--no-commit-id",
+         "--name-only", "-z", commit_sha],
+        capture_output=True, text=True, encoding="utf-8", errors="replace"
+    )
+    if result.returncode != 0:
+        logging.error(f"Error fetching files for commit {commit_sha}: {result.stderr.strip()}")
+        return None
+    return [path for path in result.stdout.split("\0") if path]
+
+
 def count_commits_on_files_last_3_months(local_repo_path, commit_sha):
     """
     Counts the number of unique commits on each file in the given commit within the last 3 months.
@@ -395,18 +609,12 @@ def count_commits_on_files_last_3_months(local_repo_path, commit_sha):
         commit_sha (str): Commit SHA to analyze.
 
     Returns:
-        int: Total number of unique commits on the files in the given commit within the last 3 months.
+        int: Total number of unique commits on the files in the given commit within the last 3 months
+             before the commit date.
     """
     # Get the list of files in the given commit
-    try:
-        result = subprocess.run(
-            ["git", "-C", local_repo_path, "show", "--name-only", "--pretty=format:", commit_sha],
-            capture_output=True, text=True, check=True
-        )
-        files_in_commit = result.stdout.strip().splitlines()
-
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error fetching files for commit {commit_sha}: {e}")
+    files_in_commit = get_commit_files(local_repo_path, commit_sha)
+    if files_in_commit is None:
         return 0
 
     if not files_in_commit:
@@ -414,164 +622,112 @@ def count_commits_on_files_last_3_months(local_repo_path, commit_sha):
         return 0
 
     # Determine the time range (last 3 months)
-    try:
-        # Get the commit date
-        result = subprocess.run(
-            ["git", "-C", local_repo_path, "show", "-s", "--format=%ci", commit_sha],
-            capture_output=True, text=True, check=True
-        )
-        commit_date_str = result.stdout.strip()
-        commit_date = datetime.strptime(commit_date_str, "%Y-%m-%d %H:%M:%S %z")
-        three_months_ago = commit_date - timedelta(days=90)
-
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error fetching commit date for {commit_sha}: {e}")
+    commit_date = get_git_backend(local_repo_path).commit_date(commit_sha)
+    if commit_date is None:
+        logging.error(f"Error fetching commit date for {commit_sha}")
         return 0
+    three_months_ago = commit_date - timedelta(days=90)
 
-    # Track unique commits per file
-    unique_commits = set()
-
-    # For each file, get the commits within the last 3 months
-    for file_path in files_in_commit:
-        try:
-            result = subprocess.run(
-                [
-                    "git", "-C", local_repo_path, "log", "--since", three_months_ago.isoformat(), 
-                    "--pretty=format:%H", "--", file_path
-                ],
-                capture_output=True, text=True, check=True
-            )
-            commits = set(result.stdout.strip().splitlines())
-            unique_commits.update(commits)
-
-        except subprocess.CalledProcessError as e:
-            logging.warning(f"Error fetching commits for file {file_path}: {e}")
-
+    # Unique commits on the files within the window, looked up in the per-repo index
+    unique_commits = get_file_touch_index(local_repo_path).commits_touching(
+        files_in_commit, int(three_months_ago.timestamp()), int(commit_date.timestamp())
+    )
     return len(unique_commits)
 
 
 
-def get_unique_committers(local_repo_path, run_date):
-    """
-    Retrieves the list of unique committers to the repository since the start of the project until the run date.
+def _to_timestamp(date):
+    """Epoch seconds of a datetime; naive datetimes (run dates from the API) are taken as UTC."""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
 
-    Args:
-        local_repo_path (str): Path to the local repository.
-        run_date (datetime): Date of the run.
 
-    Returns:
-        set: Set of unique committers (names and emails).
+class CommitterTimeline:
     """
-    unique_committers = set()
-
-    try:
-        print(f"Fetching committers using run date: {run_date}")
-
-        # Fetch committers from the start of the project until the run date
-        result = subprocess.run(
-            [
-                "git", "-C", local_repo_path, "log",
-                "--until", run_date.isoformat(),
-                "--format=%an <%ae>"
-            ],
-            capture_output=True, text=True, encoding="utf-8", errors="ignore"
-        )
-
-        if result.stdout:
-            committers = result.stdout.strip().splitlines()
-            unique_committers.update(committers)
-
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error fetching committers by run date: {e}")
-    except Exception as e:
-        logging.error(f"Unexpected error fetching committers: {e}")
+    Committer activity of a repository, taken from its CommitGraph.
 
-    return unique_committers
-
-
-
-from datetime import timedelta
-
-def get_unique_committers_3_months(local_repo_path, run_date):
+    Commits are stored as sorted timestamps with the matching author ids, plus the
+    sorted date of the first commit of every author. The number of unique
+    committers until a date is a binary search over the first-commit dates, and
+    the number within a window is the count of distinct author ids in a slice.
+    Dates are committer dates, like `git log --since/--until`.
     """
-    Retrieves the number of unique committers to the repository within the last 3 months 
-    from the given run date.
 
-    Args:
-        local_repo_path (str): Path to the local repository.
-        run_date (datetime): Date of the run.
+    def __init__(self, timestamps, author_ids, authors):
+        self.authors = list(authors)
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)[order]
+        self.author_ids = np.asarray(author_ids, dtype=np.int64)[order]
 
-    Returns:
-        set: Set of unique committers (names and emails).
-    """
-    unique_committers = set()
+        first_commit_timestamps = np.full(len(self.authors), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first_commit_timestamps, self.author_ids, self.timestamps)
+        self.first_commit_timestamps = np.sort(first_commit_timestamps)
 
-    # Calculate the 3-month window
-    start_date = run_date - timedelta(days=90)
+    @classmethod
+    def from_graph(cls, graph):
+        """Timeline of the history of HEAD (what `git log` walks by default)."""
+        return cls(graph.timestamps[graph.head_mask], graph.author_ids[graph.head_mask], graph.authors)
 
-    try:
-        print(f"Fetching committers from {start_date} to {run_date}")
+    def count_committers_until(self, until):
+        """Number of unique committers with a commit at or before the epoch timestamp `until`."""
+        return int(np.searchsorted(self.first_commit_timestamps, until, side="right"))
 
-        # Fetch committers within the 3-month window
-        result = subprocess.run(
-            [
-                "git", "-C", local_repo_path, "log",
-                f"--since={start_date.isoformat()}",
-                f"--until={run_date.isoformat()}",
-                "--format=%an <%ae>"
-            ],
-            capture_output=True, text=True, encoding="utf-8", errors="ignore"
-        )
+    def count_committers_between(self, since, until):
+        """Number of unique committers with a commit in [since, until] (epoch timestamps)."""
+        lo = np.searchsorted(self.timestamps, since, side="left")
+        hi = np.searchsorted(self.timestamps, until, side="right")
+        if hi <= lo:
+            return 0
+        return int(np.unique(self.author_ids[lo:hi]).size)
 
-        if result.stdout:
-            committers = result.stdout.strip().splitlines()
-            unique_committers.update(committers)
 
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error fetching committers for 3-month window: {e}")
-    except Exception as e:
-        logging.error(f"Unexpected error fetching committers for 3-month window: {e}")
+_commit_graphs = {}
+_commit_graphs_lock = threading.Lock()
 
-    return unique_committers
 
+def get_commit_graph(local_repo_path):
+    """Return the CommitGraph of a repository, loaded on first use and reused for every run."""
+    key = os.path.abspath(local_repo_path)
+    with _commit_graphs_lock:
+        graph = _commit_graphs.get(key)
+        if graph is None:
+            graph = _commit_graphs[key] = CommitGraph(get_git_backend(key))
+        return graph
 
 
-def get_commit_count_until_date(local_repo_path, run_date):
-    """
-    Calculates the number of commits in the repository up until the specified run date.
+_committer_timelines = {}
+_committer_timelines_lock = threading.Lock()
 
-    Args:
-        local_repo_path (str): Path to the local repository.
-        run_date (datetime): Date of the run.
 
-    Returns:
-        int: Total number of commits up until the run date.
-    """
-    commit_count = 0
+def get_committer_timeline(local_repo_path):
+    """Return the CommitterTimeline of a repository, built on first use and reused for every run."""
+    key = os.path.abspath(local_repo_path)
+    with _committer_timelines_lock:
+        timeline = _committer_timelines.get(key)
+        if timeline is None:
+            timeline = _committer_timelines[key] = CommitterTimeline.from_graph(get_commit_graph(key))
+        return timeline
 
-    try:
-        print(f"Calculating commit count until {run_date.isoformat()}")
 
-        # Fetch commit count until the run date
-        result = subprocess.run(
-            [
-                "git", "-C", local_repo_path, "rev-list",
-                "--count", "--before", run_date.isoformat(), "HEAD"
-            ],
-            capture_output=True, text=True, encoding="utf-8", errors="ignore"
-        )
+def count_unique_committers(local_repo_path, run_date):
+    """Number of unique committers (name and email) from the start of the project until the run date."""
+    return get_committer_timeline(local_repo_path).count_committers_until(_to_timestamp(run_date))
 
-        if result.stdout.strip():
-            commit_count = int(result.stdout.strip())
 
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error fetching commit count until {run_date}: {e}")
-    except Exception as e:
-        logging.error(f"Unexpected error fetching commit count: {e}")
+def count_unique_committers_3_months(local_repo_path, run_date):
+    """Number of unique committers (name and email) within the 3 months before the run date."""
+    until = _to_timestamp(run_date)
+    return get_committer_timeline(local_repo_path).count_committers_between(
+        until - int(timedelta(days=90).total_seconds()), until
+    )
 
-    return commit_count
 
 def get_commit_count_until_commit(local_repo_path, commit_sha):
+    # Answered from the commit graph; commits fetched after it was loaded fall back to git
+    commit_count = get_commit_graph(local_repo_path).count_ancestors(commit_sha)
+    if commit_count is not None:
+        return commit_count
     try:
         result = subprocess.run(
             [
@@ -586,11 +742,34 @@ def get_commit_count_until_commit(local_repo_path, commit_sha):
         return 0
 
 
+def get_commits_in_range(local_repo_path, previous_commit_sha, commit_sha, max_commits=MAX_RANGE_COMMITS):
+    """
+    Commits reachable from `commit_sha` but not from `previous_commit_sha` (`git rev-list prev..sha`),
+    newest first and capped at `max_commits`. Returns None if the range cannot be resolved.
+    """
+    result = subprocess.run(
+        ["git", "-C", local_repo_path, "rev-list", f"--max-count={max_commits}", f"{previous_commit_sha}..{commit_sha}"],
+        capture_output=True, text=True, encoding="utf-8", errors="replace"
+    )
+    if result.returncode != 0:
+        logging.warning(f"Cannot resolve commit range {previous_commit_sha}..{commit_sha}: {result.stderr.strip()}")
+        return None
+
+    commits = result.stdout.split()
+    if len(commits) >= max_commits:
+        logging.warning(f"Commit range {previous_commit_sha}..{commit_sha} capped at {max_commits} commits")
+    return commits
+
+
 # gets commits details from a last end date till and untill date
-def get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date):
+def get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date, previous_commit_sha=None):
     """
     Aggregates commit-related information, ensuring the run's commit_sha is always included,
     along with commits between the last run's end date and this run's creation date.
+
+    When `previous_commit_sha` (head commit of the previous run of the same workflow and
+    branch) is given, the commits are instead those of `previous_commit_sha..commit_sha`;
+    the dates are only used as a fallback if that range cannot be resolved.
     """
     # Initialize aggregated metrics
     total_added = total_removed = tests_added = tests_removed = 0
@@ -607,37 +786,34 @@ def get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date
     # **Ensure commit_sha is always included**
     commit_shas = [commit_sha]  # Start with the head commit of the run
 
-    # Determine the git log command based on the presence of run_plus_1_date
-    if run_plus_1_date is None:
-        # No previous run, only analyze the specific `commit_sha`
-        git_log_command = [
-            "git", "-C", local_repo_path, "show", "--pretty=format:%H", "--no-patch", commit_sha
-        ]
-    else:
-        # Subsequent builds: get commits between `until_date` and `last_end_date`
-        git_log_command = [
-            "git", "-C", local_repo_path, "log",
-            f"--since={run_plus_1_date.isoformat()}Z", f"--until={run_date.isoformat()}Z",
-            "--pretty=format:%H"
-        ]
+    range_commits = None
+    if previous_commit_sha:
+        range_commits = get_commits_in_range(local_repo_path, previous_commit_sha, commit_sha)
 
-    try:
-        result = subprocess.run(git_log_command, capture_output=True, text=True, check=True)
-        additional_commits = result.stdout.splitlines()
+    if range_commits is not None:
+        for sha in range_commits:
+            if sha not in commit_shas:
+                commit_shas.append(sha)
+    else:
+        if run_plus_1_date is None:
+            # No previous run, only analyze the specific `commit_sha`
+            additional_commits = []
+        else:
+            # Subsequent builds: commits of the history of HEAD between `run_plus_1_date` and `run_date`
+            additional_commits = get_commit_graph(local_repo_path).commits_between(
+                _to_timestamp(run_plus_1_date), _to_timestamp(run_date)
+            )
 
         # **Ensure commit_sha is at the beginning of the list**
         for sha in additional_commits:
             if sha not in commit_shas:
                 commit_shas.append(sha)
 
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error running git log for {local_repo_path}: {e}")
-
     # **Process each commit, ensuring commit_sha is processed first**
     for sha in commit_shas:
 
         # **Get detailed file changes for this commit**
-        commit_full_data = fetch_full_commit_data_local(sha, local_repo_path)
+        commit_full_data = get_cached_commit_data(sha, local_repo_path)
         if commit_full_data:
             #commits_on_files_touched.add(sha)
             total_added += commit_full_data['total_added']
@@ -657,11 +833,14 @@ def get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date
             dockerfile_changed += commit_full_data['dockerfile_changed']
             docker_compose_changed += commit_full_data['docker_compose_changed']
 
+    # Not memoized by SHA: the count depends on the history of the crawled repository (file touch
+    # index of its HEAD), not only on the commit, and the index answers it with a few binary searches
     commits_on_files_touched_count = count_commits_on_files_last_3_months(local_repo_path, commit_sha)
-    committers_3_months = get_unique_committers_3_months(local_repo_path, run_date)
-    unique_committers = get_unique_committers(local_repo_path, run_date=run_date)
-    #commit_count = get_commit_count_until_date(local_repo_path, run_date)
-    commit_count = get_commit_count_until_commit(local_repo_path, commit_sha)
+    committers_3_months = count_unique_committers_3_months(local_repo_path, run_date)
+    unique_committers = count_unique_committers(local_repo_path, run_date)
+    commit_count = _memoized(
+        "commit_count", commit_sha, lambda: get_commit_count_until_commit(local_repo_path, commit_sha)
+    )
 
 
     # **Return aggregated commit data**
@@ -679,10 +858,61 @@ def get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date
         'gh_doc_files': doc_files,
         'gh_other_files': other_files,
         'gh_commits_on_files_touched': commits_on_files_touched_count,
-        'file_types': list(file_types),
+        'file_types': sorted(file_types),
         'dockerfile_changed': dockerfile_changed,
         'docker_compose_changed': docker_compose_changed,
-        'unique_committers' : len(unique_committers),
-        "committers_3_months" : len(committers_3_months),
+        'unique_committers' : unique_committers,
+        "committers_3_months" : committers_3_months,
         "git_commits" : commit_count
     }
+
+
+def _init_commit_analysis_worker(commit_cache_path, commit_cache_max_entries, git_backend_name):
+    # Spawned workers start from a clean interpreter: open their own commit cache connection
+    configure_commit_cache(commit_cache_path, commit_cache_max_entries)
+    configure_git_backend(git_backend_name)
+
+
+def _analyze_commit(task):
+    commit_sha, local_repo_path, run_date, run_plus_1_date, previous_commit_sha = task
+    return get_commit_data_local(commit_sha, local_repo_path, run_date, run_plus_1_date, previous_commit_sha)
+
+
+class CommitAnalysisPool:
+    """
+    Pool of worker processes computing get_commit_data_local for many runs in parallel.
+
+    Every worker reads the same clone (git only reads it) and keeps its own git
+    backend, file touch index and committer timeline, which are built on first use
+    and reused for the following commits. Workers are spawned rather than forked, so
+    no git pipe or SQLite connection of the parent is shared with them.
+    """
+
+    def __init__(self, local_repo_path, workers, commit_cache_path=None, commit_cache_max_entries=DEFAULT_MAX_ENTRIES):
+        self.local_repo_path = local_repo_path
+        self._executor = ProcessPoolExecutor(
+            max_workers=max(1, int(workers)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_commit_analysis_worker,
+            initargs=(commit_cache_path, commit_cache_max_entries, _git_backend_name),
+        )
+
+    def map(self, tasks):
+        """
+        Compute the commit data of (commit_sha, run_date, run_plus_1_date, previous_commit_sha) tasks.
+        Returns the results in the order of the tasks.
+        """
+        return list(self._executor.map(
+            _analyze_commit,
+            [(commit_sha, self.local_repo_path, run_date, run_plus_1_date, previous_commit_sha)
+             for commit_sha, run_date, run_plus_1_date, previous_commit_sha in tasks],
+        ))
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+DEFAULT_RUN_WINDOW = 4
+
+
+async def _run_task(loop, executor, request_slots, func, args):
+    """Run one blocking API call in the executor once a request slot is free."""
+    async with request_slots:
+        return await loop.run_in_executor(executor, func, *args)
+
+
+async def _enrich_run(loop, executor, request_slots, run_slots, tasks):
+    """
+    Fan out all independent API calls of a single run concurrently.
+    Returns a dict with one entry per task name plus the run's wall-clock 'fetch_duration'.
+    """
+    async with run_slots:
+        start_time = time.time()
+        names = list(tasks.keys())
+        results = await asyncio.gather(
+            *(_run_task(loop, executor, request_slots, func, args) for func, args in tasks.values())
+        )
+        enrichment = dict(zip(names, results))
+        enrichment['fetch_duration'] = time.time() - start_time
+        return enrichment
+
+
+async def _enrich_runs(run_tasks, max_concurrent_requests, run_window):
+    loop = asyncio.get_running_loop()
+    request_slots = asyncio.Semaphore(max_concurrent_requests)
+    run_slots = asyncio.Semaphore(run_window)
+
+    with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+        return await asyncio.gather(
+            *(_enrich_run(loop, executor, request_slots, run_slots, tasks) for tasks in run_tasks)
+        )
+
+
+def enrich_runs(run_tasks, max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS, run_window=DEFAULT_RUN_WINDOW):
+    """
+    Execute the per-run API calls of several workflow runs concurrently.
+
+    Each run is described by a dict mapping a task name to a (callable, args) tuple,
+    e.g. {'jobs': (get_jobs_for_run, (repo, run_id, token))}. The calls of one run
+    are independent, so they are issued together; at most `run_window` runs are in
+    flight at once and at most `max_concurrent_requests` calls hit the API at the
+    same time. Rate limiting stays with the callables (get_request and friends).
+
+    Args:
+        run_tasks (list): One task dict per run.
+        max_concurrent_requests (int): Upper bound on simultaneous API calls.
+        run_window (int): Upper bound on runs being enriched at the same time.
+
+    Returns:
+        list: One result dict per run, in the same order as `run_tasks`. Each dict maps
+        the task names to their results and adds 'fetch_duration' (seconds).
+    """
+    if not run_tasks:
+        return []
+
+    max_concurrent_requests = max(1, int(max_concurrent_requests))
+    run_window = max(1, int(run_window))
+
+    start_time = time.time()
+    results = asyncio.run(_enrich_runs(run_tasks, max_concurrent_requests, run_window))
+    logging.info(f"Enriched {len(run_tasks)} run(s) in {time.time() - start_time:.2f} seconds")
+    return results
@@ -0,0 +1,505 @@
+import logging
+import shutil
+import subprocess
+import threading
+from datetime import datetime, timezone, timedelta
+
+
+# Backends selectable with `git_backend` in the config
+SUBPROCESS_BACKEND = "subprocess"
+PYGIT2_BACKEND = "pygit2"
+
+
+class NewlineCounter:
+    """
+    Byte-level line counter fed with consecutive chunks of a file.
+
+    Counts lines like readlines() in text mode (universal newlines): LF, CRLF and a
+    lone CR end a line, and a last line without a line ending still counts.
+    """
+
+    def __init__(self):
+        self._breaks = 0
+        self._last_byte = None
+
+    def update(self, chunk):
+        if not chunk:
+            return
+        self._breaks += chunk.count(b"\n") + chunk.count(b"\r") - chunk.count(b"\r\n")
+        if self._last_byte == b"\r" and chunk[:1] == b"\n":
+            self._breaks -= 1  # CRLF split across two chunks
+        self._last_byte = chunk[-1:]
+
+    @property
+    def lines(self):
+        if self._last_byte is None:
+            return 0
+        return self._breaks + (0 if self._last_byte in (b"\n", b"\r") else 1)
+
+
+def parse_diff_tree_output(output):
+    """
+    Parse the output of `git diff-tree -r --root -M --diff-merges=first-parent --raw --numstat -z
+    --pretty=format:%an <sha>`.
+
+    Returns:
+        tuple: (author, changes) where changes is a list of (status, filename, added_lines, removed_lines).
+               status is the raw status letter (A, D, M, R, C, T...); renamed and copied files are
+               reported under their new path; binary files count 0 lines.
+    """
+    author, _, body = output.partition("\n")
+    tokens = body.split("\0")
+
+    raw_entries = []
+    numstat_entries = []
+    idx = 0
+    while idx < len(tokens):
+        token = tokens[idx]
+        if not token:
+            idx += 1
+            continue
+
+        if token.startswith(":"):
+            # ":<old mode> <new mode> <old sha> <new sha> <status>" followed by one path (two for R/C)
+            status = token.split()[-1][0]
+            if status in ("R", "C"):
+                raw_entries.append((status, tokens[idx + 2]))
+                idx += 3
+            else:
+                raw_entries.append((status, tokens[idx + 1]))
+                idx += 2
+            continue
+
+        # "<added>\t<removed>\t<path>", or "<added>\t<removed>\t" followed by the old and new paths
+        added_lines, removed_lines, path = token.split("\t", 2)
+        if path:
+            idx += 1
+        else:
+            path = tokens[idx + 2]
+            idx += 3
+        numstat_entries.append((
+            int(added_lines) if added_lines.isdigit() else 0,
+            int(removed_lines) if removed_lines.isdigit() else 0,
+        ))
+
+    changes = [
+        (status, filename, added_lines, removed_lines)
+        for (status, filename), (added_lines, removed_lines) in zip(raw_entries, numstat_entries)
+    ]
+    return author.strip(), changes
+
+
+class GitObjectReader:
+    """
+    Long-lived `git cat-file --batch` / `--batch-check` co-processes for one repository.
+
+    Object lookups (blob contents, revision resolution, commit headers) are written
+    to the stdin of the running processes instead of spawning one git process per
+    query. Requests are serialized with a lock.
+    """
+
+    def __init__(self, local_repo_path):
+        self.local_repo_path = local_repo_path
+        self._batch = None
+        self._batch_check = None
+        self._lock = threading.Lock()
+
+    def _start(self, mode):
+        git_path = shutil.which("git") or "git"
+        return subprocess.Popen(
+            [git_path, "-C", self.local_repo_path, "cat-file", mode],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+
+    def _get_process(self, mode):
+        attribute = "_batch" if mode == "--batch" else "_batch_check"
+        process = getattr(self, attribute)
+        if process is None or process.poll() is not None:
+            process = self._start(mode)  # First use, or the previous process died
+            setattr(self, attribute, process)
+        return process
+
+    @staticmethod
+    def _send(process, object_name):
+        if "\n" in object_name:
+            raise ValueError(f"Object names cannot contain newlines: {object_name!r}")
+        process.stdin.write(object_name.encode("utf-8") + b"\n")
+        process.stdin.flush()
+        return process.stdout.readline().decode("utf-8", errors="replace").rstrip("\n")
+
+    def resolve(self, object_name):
+        """
+        Resolve a revision expression (e.g. 'sha', 'sha^', 'sha:path') through --batch-check.
+
+        Returns:
+            tuple: (object sha, object type, size), or None if the object does not exist.
+        """
+        with self._lock:
+            try:
+                header = self._send(self._get_process("--batch-check"), object_name)
+            except (OSError, ValueError) as e:
+                logging.warning(f"git cat-file --batch-check failed for {object_name}: {e}")
+                return None
+
+        parts = header.split()
+        if len(parts) != 3:
+            return None  # '<name> missing' or '<name> ambiguous'
+        return parts[0], parts[1], int(parts[2])
+
+    def read(self, object_name):
+        """
+        Read an object through --batch.
+
+        Returns:
+            tuple: (object type, raw content as bytes), or None if the object does not exist.
+        """
+        with self._lock:
+            try:
+                process = self._get_process("--batch")
+                parts = self._send(process, object_name).split()
+                if len(parts) != 3:
+                    return None
+                size = int(parts[2])
+                content = process.stdout.read(size)
+                process.stdout.read(1)  # Trailing newline after the contents
+            except (OSError, ValueError) as e:
+                logging.warning(f"git cat-file --batch failed for {object_name}: {e}")
+                return None
+        return parts[1], content
+
+    def count_lines(self, object_name, chunk_size=64 * 1024):
+        """
+        Count the lines of a blob by streaming it from --batch in chunks, without
+        holding the whole content in memory. Returns None if the blob does not exist.
+        """
+        with self._lock:
+            try:
+                process = self._get_process("--batch")
+                parts = self._send(process, object_name).split()
+                if len(parts) != 3:
+                    return None
+                remaining = int(parts[2])
+                counter = NewlineCounter()
+                while remaining:
+                    chunk = process.stdout.read(min(chunk_size, remaining))
+                    if not chunk:
+                        raise OSError("git cat-file --batch closed its output")
+                    counter.update(chunk)
+                    remaining -= len(chunk)
+                process.stdout.read(1)  # Trailing newline after the contents
+            except (OSError, ValueError) as e:
+                logging.warning(f"git cat-file --batch failed for {object_name}: {e}")
+                return None
+        if parts[1] != "blob":
+            return None
+        return counter.lines
+
+    def commit_date(self, commit_sha):
+        """Return the committer date of a commit as an aware datetime (like %ci), or None."""
+        obj = self.read(commit_sha)
+        if obj is None or obj[0] != "commit":
+            return None
+
+        for line in obj[1].split(b"\n"):
+            if not line:
+                break  # End of the commit headers
+            if line.startswith(b"committer "):
+                timestamp, offset = line.decode("utf-8", errors="replace").rsplit(" ", 2)[1:]
+                sign = -1 if offset.startswith("-") else 1
+                tz = timezone(sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+                return datetime.fromtimestamp(int(timestamp), tz)
+        return None
+
+    def close(self):
+        with self._lock:
+            for process in (self._batch, self._batch_check):
+                if process is None:
+                    continue
+                try:
+                    process.stdin.close()
+                    process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    process.kill()
+            self._batch = self._batch_check = None
+
+
+class SubprocessGitBackend:
+    """
+    Git backend running the `git` binary.
+
+    Object reads go through the persistent cat-file processes of a GitObjectReader;
+    diffs, tree listings and the history traversal run one git command each.
+
+    Every backend exposes the same methods:
+      - resolve(revision)        -> SHA of the object, or None
+      - read_blob(object_name)   -> bytes, or None
+      - count_lines(object_name) -> number of lines of a blob, or None
+      - commit_date(commit_sha)  -> aware datetime of the committer date, or None
+      - diff_stats(commit_sha)   -> (author, [(status, path, added, removed)]), or None
+      - list_tree_blobs(revision)-> [(blob sha, path)] of the regular files, or None
+      - iter_commits()           -> [(sha, parent shas, commit timestamp, 'name <email>')] of all refs, or None
+      - close()
+    """
+
+    name = SUBPROCESS_BACKEND
+
+    def __init__(self, local_repo_path):
+        self.local_repo_path = local_repo_path
+        self.reader = GitObjectReader(local_repo_path)
+
+    def _run_git(self, *args, errors="replace"):
+        return subprocess.run(
+            ["git", "-C", self.local_repo_path, *args],
+            capture_output=True, text=True, encoding="utf-8", errors=errors
+        )
+
+    def resolve(self, revision):
+        resolved = self.reader.resolve(revision)
+        return resolved[0] if resolved else None
+
+    def read_blob(self, object_name):
+        obj = self.reader.read(object_name)
+        if obj is None or obj[0] != "blob":
+            return None
+        return obj[1]
+
+    def count_lines(self, object_name):
+        return self.reader.count_lines(object_name)
+
+    def commit_date(self, commit_sha):
+        return self.reader.commit_date(commit_sha)
+
+    def diff_stats(self, commit_sha):
+        # One diff-tree call gives the author, the status letter and the line counts of every file.
+        # Merge commits are diffed against their first parent, like `git show --numstat` reported them.
+        result = self._run_git("diff-tree", "--always", "-r", "--root", "-M", "--diff-merges=first-parent",
+                               "--raw", "--numstat", "-z", "--pretty=format:%an", commit_sha)
+        if result.returncode != 0:
+            logging.error(f"Failed to fetch commit details for {commit_sha}: {result.stderr.strip()}")
+            return None
+        if not result.stdout:
+            logging.error(f"Commit {commit_sha} has no valid output from git diff-tree")
+            return None
+        return parse_diff_tree_output(result.stdout)
+
+    def list_tree_blobs(self, revision):
+        result = self._run_git("ls-tree", "-r", "-z", "--full-tree", revision)
+        if result.returncode != 0:
+            logging.error(f"Failed to list the tree of {revision}: {result.stderr.strip()}")
+            return None
+
+        blobs = []
+        for entry in result.stdout.split("\0"):
+            if not entry:
+                continue
+            meta, _, path = entry.partition("\t")
+            mode, object_type, object_sha = meta.split()
+            if object_type == "blob" and mode != "120000":
+                blobs.append((object_sha, path))
+        return blobs
+
+    def iter_commits(self):
+        result = self._run_git("rev-list", "--all", "--parents", "--format=%ct%x00%an <%ae>", errors="ignore")
+        if result.returncode != 0:
+            logging.error(f"Failed to list the commits of {self.local_repo_path}: {result.stderr.strip()}")
+            return None
+
+        # Output alternates "commit <sha> <parent>..." and "<timestamp>\0<author>" lines
+        commits = []
+        lines = result.stdout.splitlines()
+        for header, details in zip(lines[0::2], lines[1::2]):
+            fields = header.split()
+            if not fields or fields[0] != "commit":
+                continue
+            timestamp, _, author = details.partition("\0")
+            commits.append((fields[1], fields[2:], int(timestamp) if timestamp.isdigit() else 0, author))
+        return commits
+
+    def close(self):
+        self.reader.close()
+
+
+class Pygit2GitBackend:
+    """
+    In-process git backend built on pygit2 (libgit2): no process is spawned and no
+    text output is parsed. Same methods as SubprocessGitBackend. A libgit2
+    repository handle is not thread-safe, so calls are serialized with a lock.
+    """
+
+    name = PYGIT2_BACKEND
+
+    def __init__(self, local_repo_path):
+        import pygit2
+
+        self._pygit2 = pygit2
+        self.local_repo_path = local_repo_path
+        self.repo = pygit2.Repository(local_repo_path)
+        self._lock = threading.RLock()
+
+    def _revparse(self, revision):
+        try:
+            return self.repo.revparse_single(revision)
+        except (KeyError, ValueError, self._pygit2.GitError):
+            return None
+
+    def resolve(self, revision):
+        with self._lock:
+            obj = self._revparse(revision)
+            return str(obj.id) if obj is not None else None
+
+    def _blob(self, object_name):
+        obj = self._revparse(object_name)
+        if obj is None or obj.type != self._pygit2.enums.ObjectType.BLOB:
+            return None
+        return obj
+
+    def read_blob(self, object_name):
+        with self._lock:
+            blob = self._blob(object_name)
+            return blob.data if blob is not None else None
+
+    def count_lines(self, object_name, chunk_size=64 * 1024):
+        with self._lock:
+            blob = self._blob(object_name)
+            if blob is None:
+                return None
+            data = memoryview(blob.data)
+        counter = NewlineCounter()
+        for offset in range(0, len(data), chunk_size):
+            counter.update(bytes(data[offset:offset + chunk_size]))
+        return counter.lines
+
+    def _commit(self, commit_sha):
+        obj = self._revparse(commit_sha)
+        if obj is None:
+            return None
+        try:
+            return obj.peel(self._pygit2.Commit)
+        except (ValueError, self._pygit2.GitError):
+            return None
+
+    def commit_date(self, commit_sha):
+        with self._lock:
+            commit = self._commit(commit_sha)
+            if commit is None:
+                return None
+            offset = timedelta(minutes=commit.commit_time_offset)
+            return datetime.fromtimestamp(commit.commit_time, timezone(offset))
+
+    def diff_stats(self, commit_sha):
+        with self._lock:
+            commit = self._commit(commit_sha)
+            if commit is None:
+                logging.error(f"Failed to fetch commit details for {commit_sha}: unknown commit")
+                return None
+
+            author = commit.author.name
+            # Type changes (e.g. file to symlink) are one 'T' entry, like diff-tree, not a deletion and an addition
+            flags = self._pygit2.enums.DiffOption.INCLUDE_TYPECHANGE
+            if commit.parents:
+                # Merge commits are diffed against their first parent, like the subprocess backend
+                diff = self.repo.diff(commit.parents[0].tree, commit.tree, flags=flags)
+            else:
+                diff = commit.tree.diff_to_tree(swap=True, flags=flags)  # Root commit: everything is added
+            diff.find_similar()  # Rename detection, like -M
+
+            patches = list(diff)
+            # libgit2 uses the old side of a type change as a rename source, which git only does with -B:
+            # such a type change comes out as an 'A' of the path plus an 'R' from the path to another one
+            renames_from = {patch.delta.old_file.path: patch for patch in patches if patch.delta.status_char() == "R"}
+            split_typechanges = {
+                patch.delta.new_file.path: renames_from[patch.delta.new_file.path] for patch in patches
+                if patch.delta.status_char() == "A" and patch.delta.new_file.path in renames_from
+                and (patch.delta.new_file.mode ^ renames_from[patch.delta.new_file.path].delta.old_file.mode) & 0o170000
+            }
+            split_renames = {id(rename) for rename in split_typechanges.values()}
+
+            changes = []
+            for patch in patches:
+                delta = patch.delta
+                status = delta.status_char()
+                if status == "A" and delta.new_file.path in split_typechanges:
+                    status = "T"
+                    patch = self._blob_patch(split_typechanges[delta.new_file.path].delta.old_file.id, delta.new_file.id) or patch
+                elif id(patch) in split_renames:
+                    status = "A"
+                    patch = self._pygit2.Patch.create_from(None, self.repo[delta.new_file.id])
+                elif status == "T":
+                    # libgit2 counts no lines for a type change; numstat diffs the old and new contents
+                    patch = self._blob_patch(delta.old_file.id, delta.new_file.id) or patch
+                if patch.delta.is_binary:
+                    added_lines = removed_lines = 0
+                else:
+                    _, added_lines, removed_lines = patch.line_stats
+                changes.append((status, delta.new_file.path, added_lines, removed_lines))
+            return author, changes
+
+    def _blob_patch(self, old_id, new_id):
+        """Patch between two blobs, or None when one side is not a blob (e.g. a submodule)."""
+        try:
+            old_blob, new_blob = self.repo[old_id], self.repo[new_id]
+        except (KeyError, ValueError):
+            return None
+        blob_type = self._pygit2.enums.ObjectType.BLOB
+        if old_blob.type != blob_type or new_blob.type != blob_type:
+            return None
+        return old_blob.diff(new_blob)
+
+    def list_tree_blobs(self, revision):
+        with self._lock:
+            commit = self._commit(revision)
+            if commit is None:
+                logging.error(f"Failed to list the tree of {revision}: unknown commit")
+                return None
+
+            blobs = []
+            stack = [(commit.tree, "")]
+            while stack:
+                tree, prefix = stack.pop()
+                for entry in tree:
+                    path = prefix + entry.name
+                    if entry.type_str == "tree":
+                        stack.append((self.repo[entry.id], path + "/"))
+                    elif entry.type_str == "blob" and entry.filemode != self._pygit2.enums.FileMode.LINK:
+                        blobs.append((str(entry.id), path))
+            return blobs
+
+    def iter_commits(self):
+        with self._lock:
+            walker = self.repo.walk(None, self._pygit2.enums.SortMode.NONE)
+            for reference_name in self.repo.references:
+                try:
+                    walker.push(self.repo.references[reference_name].peel(self._pygit2.Commit).id)
+                except (ValueError, self._pygit2.GitError):
+                    continue  # Reference to a tag of a non-commit object, or a broken reference
+            try:
+                walker.push(self.repo.head.peel(self._pygit2.Commit).id)
+            except (ValueError, self._pygit2.GitError):
+                pass
+
+            return [
+                (str(commit.id), [str(parent_id) for parent_id in commit.parent_ids], commit.commit_time,
+                 f"{commit.author.name} <{commit.author.email}>")
+                for commit in walker
+            ]
+
+    def close(self):
+        with self._lock:
+            self.repo.free()
+
+
+def create_git_backend(local_repo_path, backend_name=SUBPROCESS_BACKEND):
+    """
+    Create the git backend `backend_name` ('subprocess' or 'pygit2') for a repository.
+    Falls back to the subprocess backend when pygit2 is not installed or cannot open the repository.
+    """
+    if backend_name == PYGIT2_BACKEND:
+        try:
+            return Pygit2GitBackend(local_repo_path)
+        except ImportError:
+            logging.warning("pygit2 is not installed (pip install pygit2), using the git subprocess backend.")
+        except Exception as e:
+            logging.warning(f"pygit2 cannot open {local_repo_path}, using the git subprocess backend: {e}")
+    elif backend_name != SUBPROCESS_BACKEND:
+        logging.warning(f"Unknown git backend '{backend_name}', using the git subprocess backend.")
+    return SubprocessGitBackend(local_repo_path)
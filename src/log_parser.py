@@ -1,7 +1,8 @@
 import re
 import requests
 import base64
-from request_github import get_request
+from request_github import get_request, github_get
+from token_pool import TokenPool
 import logging
 
 import re
@@ -271,19 +272,22 @@ def get_github_actions_log(repo_full_name, run_id, token=None, max_retries=3):
     Handles binary (ZIP) responses correctly and retries on rate limits.
     """
     url = f"https://api.github.com/repos/{repo_full_name}/actions/runs/{run_id}/logs"
-    headers = {"Authorization": f"token {token}"} if token else {}
 
     retries = 0  # Track retries
 
     while retries < max_retries:
         try:
-            response = requests.get(url, headers=headers, stream=True)  # Use raw binary stream
+            response = github_get(url, token, stream=True)  # Use raw binary stream
             
             if response.status_code == 200:
                 return response.content  # Return raw binary log data
             
-            elif response.status_code == 403:  # Rate limit exceeded
+            elif response.status_code in (403, 429):  # Rate limit exceeded
                 rate_limit_reset = response.headers.get("X-RateLimit-Reset")
+                if isinstance(token, TokenPool) and response.headers.get("X-RateLimit-Remaining") == "0":
+                    # The pool recorded the exhausted token and only sleeps once every token is exhausted
+                    logging.warning(f"Token exhausted, retrying with the next token in the pool. URL: {url}")
+                    continue
                 if rate_limit_reset:
                     wait_time = int(rate_limit_reset) - int(time.time()) + 1  # Ensure at least 1s wait
                     logging.warning(f"GitHub API rate limit exceeded. Sleeping for {wait_time} seconds...")
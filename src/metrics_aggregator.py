@@ -2,6 +2,13 @@ import csv
 import pandas as pd
 import os
 import logging
+import json
+import math
+import copy
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
 
 
 
@@ -108,3 +115,476 @@ def save_head_old(output_csv):
         writer.writeheader()
     logging.info(f"CSV header with fetch duration saved to {output_csv}")
 
+
+
+DEFAULT_BATCH_SIZE = 50
+
+
+class CsvBuildSink:
+    """
+    Append-only CSV output with an in-memory index of the build ids already written.
+
+    The existing file is read once when the sink is created; afterwards duplicate
+    checks are set lookups and new rows are buffered and appended in batches, so
+    the cost of writing a row no longer grows with the size of the output file.
+    """
+
+    def __init__(self, output_csv, batch_size=DEFAULT_BATCH_SIZE, fsync=False):
+        self.output_csv = output_csv
+        self.batch_size = max(1, int(batch_size))
+        self.fsync = fsync
+        self.fieldnames = None
+        self._ids_by_repo = {}
+        self._buffer = []
+        self._load_existing()
+
+    def _load_existing(self):
+        if not os.path.exists(self.output_csv) or os.path.getsize(self.output_csv) == 0:
+            return
+
+        with open(self.output_csv, mode='r', newline='', encoding='utf-8') as file:
+            self.fieldnames = next(csv.reader(file), None)
+
+        try:
+            existing_df = pd.read_csv(self.output_csv, usecols=['repo', 'id_build'], dtype=str)
+            for repo, ids in existing_df.groupby('repo')['id_build']:
+                self._ids_by_repo[repo] = set(ids)
+        except Exception as e:
+            logging.error(f"Error reading existing build IDs from {self.output_csv}: {e}")
+
+        logging.info(f"Loaded {sum(len(ids) for ids in self._ids_by_repo.values())} existing build id(s) from {self.output_csv}")
+
+    def existing_build_ids(self, repo_full_name):
+        """Return the set of build ids (as strings) already stored for the repository."""
+        return set(self._ids_by_repo.get(repo_full_name, set()))
+
+    def contains(self, build_info):
+        return str(build_info['id_build']) in self._ids_by_repo.get(build_info['repo'], set())
+
+    def add(self, build_info):
+        """Buffer a build unless it is already stored; flushes once a batch is full. Returns True if added."""
+        if self.contains(build_info):
+            return False
+        self._ids_by_repo.setdefault(build_info['repo'], set()).add(str(build_info['id_build']))
+        self._buffer.append(build_info)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Append the buffered builds to the CSV file."""
+        if not self._buffer:
+            return
+
+        if self.fieldnames is None:
+            # Dynamically determine the fieldnames from the first build written
+            self.fieldnames = list(self._buffer[0].keys())
+
+        missing_columns = set(self._buffer[0].keys()) - set(self.fieldnames)
+        if missing_columns:
+            logging.warning(f"Columns {sorted(missing_columns)} are not in the header of {self.output_csv} and are not written.")
+
+        with open(self.output_csv, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=self.fieldnames, extrasaction='ignore')
+            if file.tell() == 0:
+                writer.writeheader()  # Write header if file is empty
+            writer.writerows(self._to_csv_row(build) for build in self._buffer)
+            file.flush()
+            if self.fsync:
+                os.fsync(file.fileno())
+
+        logging.info(f"{len(self._buffer)} new build(s) added to {self.output_csv}.")
+        self._buffer = []
+
+    @staticmethod
+    def _to_csv_row(build_info):
+        """Store nested job details as a JSON string in the CSV cell."""
+        if isinstance(build_info.get('job_details'), list):
+            return {**build_info, 'job_details': json.dumps(build_info['job_details'])}
+        return build_info
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _build_parquet_schema(pa):
+    """Arrow types of the known build columns; columns not listed here are inferred."""
+    timestamp = pa.timestamp('s', tz='UTC')
+    step = pa.struct([
+        ('step_name', pa.string()),
+        ('step_conclusion', pa.string()),
+        ('step_start', timestamp),
+        ('step_end', timestamp),
+        ('step_duration', pa.float64()),
+    ])
+    job = pa.struct([
+        ('job_name', pa.string()),
+        ('job_start', timestamp),
+        ('job_end', timestamp),
+        ('job_duration', pa.float64()),
+        ('job_result', pa.string()),
+        ('steps', pa.list_(step)),
+    ])
+
+    int_columns = [
+        'id_build', 'workflow_id', 'run_attempt', 'total_builds', 'dependencies_count', 'workflow_size',
+        'gh_sloc', 'tests_passed', 'tests_failed', 'tests_skipped', 'tests_total', 'total_jobs',
+        'gh_files_added', 'gh_files_deleted', 'gh_files_modified', 'gh_lines_added', 'gh_lines_deleted',
+        'gh_src_churn', 'gh_tests_added', 'gh_tests_deleted', 'gh_test_churn', 'gh_src_files', 'gh_doc_files',
+        'gh_other_files', 'gh_commits_on_files_touched', 'dockerfile_changed', 'docker_compose_changed',
+        'git_num_committers', 'git_commits', 'gh_team_size_last_3_month', 'gh_pull_req_number',
+        'gh_num_pr_comments', 'gh_description_complexity',
+    ]
+    string_columns = [
+        'issuer_name', 'branch', 'commit_sha', 'languages', 'status', 'workflow_event_trigger', 'conclusion',
+        'gh_first_commit_created_at', 'build_language', 'workflow_name', 'git_merged_with',
+    ]
+
+    fields = {name: pa.int64() for name in int_columns}
+    fields.update({name: pa.string() for name in string_columns})
+    fields.update({
+        'created_at': timestamp,
+        'updated_at': timestamp,
+        'build_duration': pa.float64(),
+        'fetch_duration': pa.float64(),
+        'gh_test_lines_per_kloc': pa.float64(),
+        'tests_ran': pa.bool_(),
+        'gh_is_pr': pa.bool_(),
+        'test_framework': pa.list_(pa.string()),
+        'file_types': pa.list_(pa.string()),
+        'gh_job_id': pa.list_(pa.int64()),
+        'job_details': pa.list_(job),
+    })
+    return fields
+
+
+def _parse_github_timestamp(value):
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def _as_number(value):
+    """Map the placeholders used for missing numbers ('N/A', NaN) to None."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class ParquetBuildSink:
+    """
+    Columnar output: builds are written as Parquet files with typed columns,
+    nested job/step structs, and hive-style partitions by repository and month
+    (<root>/repo=<owner%2Fname>/month=<YYYY-MM>/part-*.parquet).
+
+    Requires pyarrow. Every flush writes one file per partition, so larger batches
+    give fewer, bigger files.
+    """
+
+    def __init__(self, output_dir, batch_size=DEFAULT_BATCH_SIZE):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("The Parquet output requires pyarrow (pip install pyarrow).") from e
+
+        self._pa = pa
+        self._pq = pq
+        self._schema_fields = _build_parquet_schema(pa)
+        self.output_dir = output_dir
+        self.batch_size = max(1, int(batch_size))
+        self._ids_by_repo = {}
+        self._buffer = []
+        os.makedirs(output_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        import pyarrow.dataset as ds
+
+        try:
+            dataset = ds.dataset(self.output_dir, format='parquet', partitioning='hive')
+            if 'id_build' not in dataset.schema.names:
+                return
+            table = dataset.to_table(columns=['repo', 'id_build'])
+        except Exception as e:
+            logging.error(f"Error reading existing build IDs from {self.output_dir}: {e}")
+            return
+
+        for repo, build_id in zip(table.column('repo').to_pylist(), table.column('id_build').to_pylist()):
+            self._ids_by_repo.setdefault(repo, set()).add(str(build_id))
+        logging.info(f"Loaded {table.num_rows} existing build id(s) from {self.output_dir}")
+
+    def existing_build_ids(self, repo_full_name):
+        """Return the set of build ids (as strings) already stored for the repository."""
+        return set(self._ids_by_repo.get(repo_full_name, set()))
+
+    def contains(self, build_info):
+        return str(build_info['id_build']) in self._ids_by_repo.get(build_info['repo'], set())
+
+    def add(self, build_info):
+        """Buffer a build unless it is already stored; flushes once a batch is full. Returns True if added."""
+        if self.contains(build_info):
+            return False
+        self._ids_by_repo.setdefault(build_info['repo'], set()).add(str(build_info['id_build']))
+        self._buffer.append(build_info)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        return True
+
+    def _to_parquet_row(self, build_info):
+        """Convert one build to values matching the Arrow schema."""
+        row = {}
+        for name, value in build_info.items():
+            field_type = self._schema_fields.get(name)
+            if field_type is None:
+                row[name] = value
+            elif self._pa.types.is_timestamp(field_type):
+                row[name] = _parse_github_timestamp(value)
+            elif self._pa.types.is_integer(field_type) or self._pa.types.is_floating(field_type):
+                row[name] = _as_number(value)
+            elif self._pa.types.is_list(field_type) and value is not None:
+                row[name] = list(value)
+            else:
+                row[name] = value
+
+        for job in row.get('job_details') or []:
+            job['job_start'] = _parse_github_timestamp(job.get('job_start'))
+            job['job_end'] = _parse_github_timestamp(job.get('job_end'))
+            job['job_duration'] = _as_number(job.get('job_duration'))
+            for step in job.get('steps') or []:
+                step['step_start'] = _parse_github_timestamp(step.get('step_start'))
+                step['step_end'] = _parse_github_timestamp(step.get('step_end'))
+                step['step_duration'] = _as_number(step.get('step_duration'))
+        return row
+
+    def flush(self):
+        """Write the buffered builds, one Parquet file per (repo, month) partition."""
+        if not self._buffer:
+            return
+
+        partitions = {}
+        for build_info in self._buffer:
+            created_at = _parse_github_timestamp(build_info.get('created_at'))
+            month = created_at.strftime('%Y-%m') if created_at else 'unknown'
+            row = self._to_parquet_row(copy.deepcopy(build_info))
+            row.pop('repo', None)  # Stored in the partition path
+            partitions.setdefault((build_info['repo'], month), []).append(row)
+
+        for (repo, month), rows in partitions.items():
+            columns = list(dict.fromkeys(name for row in rows for name in row))
+            fields = []
+            for name in columns:
+                values = [row.get(name) for row in rows]
+                field_type = self._schema_fields.get(name)
+                fields.append(self._pa.field(name, field_type if field_type is not None else self._pa.array(values).type))
+            schema = self._pa.schema(fields)
+            table = self._pa.Table.from_pylist(rows, schema=schema)
+
+            partition_dir = os.path.join(self.output_dir, f"repo={quote(repo, safe='')}", f"month={month}")
+            os.makedirs(partition_dir, exist_ok=True)
+            self._pq.write_table(table, os.path.join(partition_dir, f"part-{uuid.uuid4().hex}.parquet"))
+
+        logging.info(f"{len(self._buffer)} new build(s) added to {self.output_dir}.")
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _sqlite_value(value):
+    """Lists and sets are stored as JSON text, NaN / 'N/A' placeholders of numeric columns as NULL."""
+    if isinstance(value, (list, tuple, set)):
+        return json.dumps(list(value))
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value == "N/A":
+        return None
+    return value
+
+
+def _sqlite_type(value):
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+class SQLiteBuildSink:
+    """
+    SQLite output with builds, jobs and steps in normalized tables.
+
+    builds is keyed by id_build and indexed on (repo, workflow_id, created_at), so
+    existence checks are indexed lookups and re-inserting a build is an upsert
+    (INSERT ... ON CONFLICT). The database runs in WAL mode with a busy timeout,
+    which lets several collector processes write to the same file.
+    """
+
+    def __init__(self, db_path, batch_size=DEFAULT_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self._buffer = []
+        self._connection = sqlite3.connect(db_path, timeout=60)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._build_columns = self._get_columns("builds")
+
+    def _create_tables(self):
+        with self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS builds (
+                    id_build INTEGER PRIMARY KEY,
+                    repo TEXT NOT NULL,
+                    workflow_id INTEGER,
+                    created_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_builds_repo_workflow_created
+                    ON builds (repo, workflow_id, created_at);
+
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id_build INTEGER NOT NULL REFERENCES builds (id_build),
+                    job_index INTEGER NOT NULL,
+                    job_id INTEGER,
+                    job_name TEXT,
+                    job_start TEXT,
+                    job_end TEXT,
+                    job_duration REAL,
+                    job_result TEXT,
+                    PRIMARY KEY (id_build, job_index)
+                );
+
+                CREATE TABLE IF NOT EXISTS steps (
+                    id_build INTEGER NOT NULL,
+                    job_index INTEGER NOT NULL,
+                    step_index INTEGER NOT NULL,
+                    step_name TEXT,
+                    step_conclusion TEXT,
+                    step_start TEXT,
+                    step_end TEXT,
+                    step_duration REAL,
+                    PRIMARY KEY (id_build, job_index, step_index)
+                );
+            """)
+
+    def _get_columns(self, table):
+        return [row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")]
+
+    def _ensure_columns(self, build_info):
+        """Add build columns that are not in the table yet (the collected metrics depend on the config)."""
+        for name, value in build_info.items():
+            if name in self._build_columns or name == 'job_details':
+                continue
+            try:
+                with self._connection:
+                    self._connection.execute(f'ALTER TABLE builds ADD COLUMN "{name}" {_sqlite_type(value)}')
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise  # Another collector may have added it concurrently
+            self._build_columns.append(name)
+
+    def existing_build_ids(self, repo_full_name):
+        """Return the set of build ids (as strings) already stored for the repository."""
+        rows = self._connection.execute("SELECT id_build FROM builds WHERE repo = ?", (repo_full_name,))
+        return {str(row[0]) for row in rows}
+
+    def contains(self, build_info):
+        row = self._connection.execute("SELECT 1 FROM builds WHERE id_build = ?", (int(build_info['id_build']),)).fetchone()
+        return row is not None
+
+    def add(self, build_info):
+        """Buffer a build for an upsert; flushes once a batch is full. Returns True."""
+        self._buffer.append(build_info)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        return True
+
+    def _upsert_build(self, build_info):
+        columns = [name for name in build_info if name != 'job_details']
+        quoted = ', '.join(f'"{name}"' for name in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        updates = ', '.join(f'"{name}" = excluded."{name}"' for name in columns if name != 'id_build')
+        self._connection.execute(
+            f"INSERT INTO builds ({quoted}) VALUES ({placeholders}) ON CONFLICT (id_build) DO UPDATE SET {updates}",
+            [_sqlite_value(build_info[name]) for name in columns],
+        )
+
+        job_details = build_info.get('job_details')
+        if job_details is None:
+            return
+
+        id_build = build_info['id_build']
+        job_ids = build_info.get('gh_job_id') or []
+        self._connection.execute("DELETE FROM steps WHERE id_build = ?", (id_build,))
+        self._connection.execute("DELETE FROM jobs WHERE id_build = ?", (id_build,))
+        for job_index, job in enumerate(job_details):
+            self._connection.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (id_build, job_index, job_ids[job_index] if job_index < len(job_ids) else None, job.get('job_name'),
+                 job.get('job_start'), job.get('job_end'), _sqlite_value(job.get('job_duration')), job.get('job_result')),
+            )
+            self._connection.executemany(
+                "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(id_build, job_index, step_index, step.get('step_name'), step.get('step_conclusion'),
+                  step.get('step_start'), step.get('step_end'), _sqlite_value(step.get('step_duration')))
+                 for step_index, step in enumerate(job.get('steps') or [])],
+            )
+
+    def flush(self):
+        """Upsert the buffered builds with their jobs and steps in one transaction."""
+        if not self._buffer:
+            return
+
+        for build_info in self._buffer:
+            self._ensure_columns(build_info)
+        with self._connection:
+            for build_info in self._buffer:
+                self._upsert_build(build_info)
+
+        logging.info(f"{len(self._buffer)} build(s) upserted into {self.db_path}.")
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def create_build_sink(config, output_csv):
+    """
+    Create the output sink selected by `output_format` in the config ('csv', 'parquet' or 'sqlite').
+    """
+    output_format = config.get("output_format", "csv")
+    batch_size = config.get("output_batch_size", DEFAULT_BATCH_SIZE)
+
+    if output_format == "parquet":
+        return ParquetBuildSink(config.get("output_parquet_dir", "builds_features_parquet"), batch_size=batch_size)
+    if output_format == "sqlite":
+        return SQLiteBuildSink(config.get("output_sqlite_path", "builds_features.sqlite"), batch_size=batch_size)
+    if output_format != "csv":
+        logging.warning(f"Unknown output_format '{output_format}', writing CSV instead.")
+    return CsvBuildSink(output_csv, batch_size=batch_size, fsync=config.get("output_fsync", False))
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+
+
+DEFAULT_BURST = 10
+
+
+class AdaptiveThrottle:
+    """
+    Token bucket that paces GitHub API calls to the quota actually available.
+
+    The refill rate is derived from the X-RateLimit-Remaining / X-RateLimit-Reset
+    headers of every tracked token: each token contributes remaining / seconds
+    until its reset, so the budget is spread evenly over the rest of the window
+    instead of being burned early and then sleeping. A Retry-After header
+    (secondary rate limit) blocks all callers for the requested time.
+    """
+
+    def __init__(self, burst=DEFAULT_BURST):
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last_refill = time.time()
+        self._quotas = {}  # key -> (remaining, reset epoch)
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill_rate(self, now):
+        """
+        Requests per second allowed by the known quotas.
+        Returns None when some quota is unknown or has already been reset (no pacing needed).
+        """
+        if not self._quotas:
+            return None
+        rate = 0.0
+        for remaining, reset_time in self._quotas.values():
+            if remaining is None or reset_time <= now:
+                return None
+            rate += remaining / max(1.0, reset_time - now)
+        return rate
+
+    def acquire(self):
+        """Block until the next request fits in the budget."""
+        while True:
+            with self._lock:
+                now = time.time()
+                if now < self._blocked_until:
+                    wait_time = self._blocked_until - now
+                else:
+                    rate = self._refill_rate(now)
+                    if rate is None:
+                        self._tokens = float(self.burst)
+                        self._last_refill = now
+                        return
+
+                    self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * rate)
+                    self._last_refill = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+
+                    if rate > 0:
+                        wait_time = (1 - self._tokens) / rate
+                    else:
+                        # Every quota is exhausted: wait for the earliest reset
+                        wait_time = min(reset_time for _, reset_time in self._quotas.values()) - now + 1
+
+            if wait_time > 60:
+                logging.warning(f"Rate limit budget exhausted. Sleeping for {wait_time:.0f} seconds.")
+            time.sleep(wait_time)
+
+    def track(self, keys):
+        """Register keys (tokens) whose quota is not known yet; no pacing applies until all of them report it."""
+        with self._lock:
+            for key in keys:
+                self._quotas.setdefault(key, (None, 0))
+
+    def update(self, key, headers):
+        """Record the quota reported in the response headers of a request made with `key`."""
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_time = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset_time is None:
+            return
+        with self._lock:
+            self._quotas[key] = (int(remaining), int(reset_time))
+
+    def backoff(self, seconds):
+        """Block every caller for `seconds` (used for Retry-After on secondary rate limits)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.time() + seconds)
+        logging.warning(f"Secondary rate limit hit. Backing off for {seconds} seconds.")
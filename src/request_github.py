@@ -7,29 +7,178 @@ import math
 import logging
 import base64
 import re
+import threading
+from email.utils import parsedate_to_datetime
 import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from response_cache import ResponseCache
+from token_pool import TokenPool
+from rate_limiter import AdaptiveThrottle, DEFAULT_BURST
+
+
+DEFAULT_POOL_SIZE = 20
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_TIMEOUT = 30
+# Backoff after a rate-limited response: at least MIN_RETRY_AFTER seconds, DEFAULT_RETRY_AFTER
+# when its Retry-After header cannot be parsed (GitHub asks to wait at least one minute then)
+MIN_RETRY_AFTER = 1
+DEFAULT_RETRY_AFTER = 60
+
+_session = None
+_session_lock = threading.RLock()
+_response_cache = None
+_throttle = AdaptiveThrottle()
+
+
+def configure_session(pool_size=DEFAULT_POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    (Re)create the process-wide HTTP session used for every GitHub API call.
+
+    The session keeps connections to api.github.com alive between requests, so
+    consecutive calls reuse the same TCP+TLS connection instead of paying a new
+    handshake each time.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections kept per host.
+        max_retries (int): Transport-level retries for connection errors and
+            transient 5xx responses before the response is handed back.
+
+    Returns:
+        requests.Session: The newly configured session.
+    """
+    global _session
+
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=1,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=False,  # Retry-After goes to the shared throttle (github_get), not one thread
+        raise_on_status=False,  # Let callers inspect the final response
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    with _session_lock:
+        old_session, _session = _session, session
+    if old_session is not None:
+        old_session.close()
+    return session
+
+
+def get_session():
+    """Return the shared HTTP session, creating it with default settings on first use."""
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                return configure_session()
+    return _session
+
+
+def parse_retry_after(value):
+    """Seconds to wait for a Retry-After header, given in seconds or as an HTTP date."""
+    value = value.strip()
+    if value.isdigit():
+        return max(MIN_RETRY_AFTER, int(value))
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(MIN_RETRY_AFTER, math.ceil((retry_at - datetime.now(timezone.utc)).total_seconds()))
+
+
+def github_get(url, token=None, **kwargs):
+    """
+    Issue a GET request through the shared session and return the raw response.
+    Use this instead of requests.get so all modules share the same connection pool.
+
+    `token` is either a token string or a TokenPool; with a pool, the token with the
+    most remaining quota is used and its quota is updated from the response headers.
+    """
+    pool = token if isinstance(token, TokenPool) else None
+    if pool is not None:
+        _throttle.track(pool.tokens)
+        token = pool.acquire()
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    if token:
+        headers.setdefault('Authorization', f'token {token}')
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+    _throttle.acquire()  # Pace the request to the remaining rate-limit budget
+    response = get_session().get(url, headers=headers, **kwargs)
+
+    if pool is not None:
+        pool.update(token, response.headers)
+    _throttle.update(token, response.headers)
+    retry_after = response.headers.get('Retry-After')
+    if response.status_code in (403, 429) and retry_after:
+        _throttle.backoff(parse_retry_after(retry_after))
+    return response
+
+
+def configure_throttle(burst=DEFAULT_BURST):
+    """Replace the process-wide adaptive throttle, e.g. to change its burst size."""
+    global _throttle
+    _throttle = AdaptiveThrottle(burst)
+    return _throttle
+
+
+def configure_response_cache(cache_dir):
+    """
+    Back get_request with an on-disk ETag / Last-Modified cache stored in `cache_dir`.
+    Pass None (or an empty string) to disable caching.
+    """
+    global _response_cache
+    _response_cache = ResponseCache(cache_dir) if cache_dir else None
+    return _response_cache
+
 
 def get_request(url, token):
-    headers = {'Authorization': f'token {token}'}
     attempt = 0
     max_attempts = 5  # Number of attempts before applying infinite retry on connection errors
 
+    # Revalidate a previously cached body instead of downloading it again
+    cached_entry = _response_cache.get(url) if _response_cache else None
+    conditional_headers = ResponseCache.conditional_headers(cached_entry)
+
     while True:
         try:
-            response = requests.get(url, headers=headers, timeout=10)  # Set a timeout to avoid hanging requests
+            response = github_get(url, token, headers=conditional_headers, timeout=10)  # Set a timeout to avoid hanging requests
             
             # Check rate limit headers proactively
             remaining_requests = int(response.headers.get('X-RateLimit-Remaining', 1))  # Default to 1 if missing
             reset_time = response.headers.get('X-RateLimit-Reset')
 
-            if remaining_requests == 0 and reset_time:
+            if response.status_code in (403, 429) and 'Retry-After' in response.headers:
+                logging.warning(f"Secondary rate limit hit, retrying after the throttle backoff. URL: {url}")
+                continue  # github_get already told the throttle to back off
+            elif remaining_requests == 0 and reset_time and isinstance(token, TokenPool):
+                if response.status_code in (403, 429):
+                    logging.warning(f"Token exhausted, retrying with the next token in the pool. URL: {url}")
+                    continue  # The pool recorded the exhausted token and will pick another one (or wait)
+            elif remaining_requests == 0 and reset_time:
                 sleep_time = max(0, (datetime.fromtimestamp(int(reset_time), timezone.utc) - datetime.now(timezone.utc)).total_seconds() + 10)
                 logging.warning(f"Rate limit hit! Sleeping for {sleep_time} seconds.")
                 time.sleep(sleep_time)
                 continue  # Retry after sleeping
 
-            if response.status_code == 200:
-                return response.json()
+            if response.status_code == 304 and cached_entry is not None:
+                return cached_entry['body']  # Not modified, replay the cached body
+            elif response.status_code == 200:
+                body = response.json()
+                if _response_cache:
+                    _response_cache.put(url, response.headers, body)
+                return body
             elif response.status_code == 403 and reset_time:
                 sleep_time = max(0, (datetime.fromtimestamp(int(reset_time), timezone.utc) - datetime.now(timezone.utc)).total_seconds() + 10)
                 logging.error(f"Rate limit exceeded, sleeping for {sleep_time} seconds. URL: {url}")
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+
+class ResponseCache:
+    """
+    On-disk cache of GitHub API responses keyed by URL.
+
+    For every cached URL the ETag / Last-Modified validators are stored next to the
+    decoded JSON body. The next request for the same URL is sent as a conditional
+    request; when GitHub answers 304 Not Modified the cached body is replayed. 304
+    responses do not count against the primary rate limit.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, url):
+        """Return the cached entry for `url` ({'etag', 'last_modified', 'body'}) or None."""
+        path = self._entry_path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+        return entry if entry.get('url') == url else None
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Build the If-None-Match / If-Modified-Since headers for a cached entry."""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, response_headers, body):
+        """Store `body` for `url` if the response carries a validator; otherwise do nothing."""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        path = self._entry_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'url': url, 'etag': etag, 'last_modified': last_modified, 'body': body}
+
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Failed to cache response for {url}: {e}")
@@ -0,0 +1,287 @@
+import logging
+import math
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from request_github import github_get
+
+
+RUNS_PER_PAGE = 100
+# GitHub returns at most 1,000 runs for a listing filtered with `created`
+MAX_FILTERED_RUNS = 1000
+DEFAULT_PREFETCH_WORKERS = 4
+DEFAULT_PREFETCH_QUEUE_SIZE = 4
+
+
+class RunListingError(Exception):
+    """
+    Raised when the listing of workflow runs is incomplete: a page cannot be fetched, or
+    GitHub stopped at MAX_FILTERED_RUNS runs of a `created`-filtered listing that has more.
+    """
+
+
+def is_listing_truncated(total_count, created=None):
+    """True if GitHub lists only part of the `total_count` runs (listings filtered with `created`)."""
+    return bool(created) and total_count > MAX_FILTERED_RUNS
+
+
+def _truncated_listing_error(repo_full_name, workflow_id, created, total_count):
+    scope = f"workflow {workflow_id}" if workflow_id is not None else "all workflows"
+    return RunListingError(
+        f"{repo_full_name} ({scope}): only {MAX_FILTERED_RUNS} of the {total_count} runs created {created} were listed"
+    )
+
+
+def build_created_filter(from_date=None, to_date=None):
+    """
+    Build the `created` qualifier of the runs endpoints from an optional date range.
+
+    Returns:
+        str: e.g. '2023-01-01..2023-12-31', '>=2023-01-01', '<=2023-12-31', or None without bounds.
+    """
+    if from_date and to_date:
+        return f"{from_date}..{to_date}"
+    if from_date:
+        return f">={from_date}"
+    if to_date:
+        return f"<={to_date}"
+    return None
+
+
+def get_runs_url(repo_full_name, workflow_id=None, page=1, created=None):
+    """
+    URL of one page of workflow runs: the repo-wide /actions/runs listing when
+    `workflow_id` is None, otherwise the listing of that workflow only.
+    """
+    if workflow_id is None:
+        url = f"https://api.github.com/repos/{repo_full_name}/actions/runs?page={page}&per_page={RUNS_PER_PAGE}"
+    else:
+        url = f"https://api.github.com/repos/{repo_full_name}/actions/workflows/{workflow_id}/runs?page={page}&per_page={RUNS_PER_PAGE}"
+    if created:
+        url += f"&created={quote(created)}"
+    return url
+
+
+def fetch_run_page(repo_full_name, token, workflow_id=None, page=1, created=None):
+    """
+    Fetch one page of workflow runs.
+
+    Returns:
+        tuple: (workflow_runs, total_count, has_next_page)
+
+    Raises:
+        RunListingError: If the page cannot be fetched.
+    """
+    scope = f"workflow {workflow_id}" if workflow_id is not None else "all workflows"
+    response = github_get(get_runs_url(repo_full_name, workflow_id, page, created), token)
+
+    if response.status_code != 200:
+        logging.error(f"Failed to fetch builds for {repo_full_name} ({scope}, page: {page}), status: {response.status_code}")
+        raise RunListingError(f"{repo_full_name} ({scope}), page {page}: status {response.status_code}")
+
+    response_data = response.json()
+    total_count = response_data.get('total_count', 0)
+
+    if page == 1 and is_listing_truncated(total_count, created):
+        logging.warning(
+            f"{total_count} runs match created={created} for {repo_full_name} ({scope}), "
+            f"but GitHub only lists the first {MAX_FILTERED_RUNS}. Use a narrower date range."
+        )
+
+    return response_data.get('workflow_runs') or [], total_count, 'next' in response.headers.get('Link', '')
+
+
+def iter_run_pages(repo_full_name, token, workflow_id=None, created=None):
+    """
+    Yield (page, workflow_runs) for every page of runs, newest first.
+
+    Args:
+        repo_full_name (str): The full repository name (owner/repo).
+        token (str or TokenPool): GitHub API token(s).
+        workflow_id (int, optional): Restrict the listing to one workflow; None lists the whole repo.
+        created (str, optional): `created` qualifier (see build_created_filter), applied server-side.
+
+    Raises:
+        RunListingError: If a page cannot be fetched, or, once the last page was yielded,
+            if GitHub listed only MAX_FILTERED_RUNS of the runs matching `created`.
+    """
+    scope = f"workflow {workflow_id}" if workflow_id is not None else "all workflows"
+    page = 1
+    total_count = 0
+
+    while True:
+        workflow_runs, page_total_count, has_next_page = fetch_run_page(repo_full_name, token, workflow_id, page, created)
+        total_count = max(total_count, page_total_count)
+        if not workflow_runs:
+            logging.info(f"No workflow runs found on page {page} for {repo_full_name} ({scope}).")
+            break  # Stop if no more data
+
+        yield page, workflow_runs
+
+        if not has_next_page:
+            break  # No more pages left
+        page += 1
+
+    if is_listing_truncated(total_count, created):
+        raise _truncated_listing_error(repo_full_name, workflow_id, created, total_count)
+
+
+class RunPagePrefetcher:
+    """
+    Producer side of the listing pipeline.
+
+    A background thread fetches the first page, derives the number of pages from
+    `total_count` and fetches the following pages concurrently (at most `workers`
+    requests in flight). Pages are put in order into a bounded queue, so the
+    enrichment of page N overlaps with the download of the next pages while
+    memory stays bounded. Iterating over the prefetcher consumes the queue.
+
+    With a sync watermark (`stop_run_id`), the listing usually ends after a few
+    pages, so pages are requested one at a time, and nothing is scheduled after
+    the page that follows the first run at or below the watermark.
+    """
+
+    _END = object()
+
+    def __init__(self, repo_full_name, token, workflow_id=None, created=None,
+                 workers=DEFAULT_PREFETCH_WORKERS, queue_size=DEFAULT_PREFETCH_QUEUE_SIZE, stop_run_id=None):
+        self.repo_full_name = repo_full_name
+        self.token = token
+        self.workflow_id = workflow_id
+        self.created = created
+        self.stop_run_id = stop_run_id
+        self.workers = max(1, int(workers)) if stop_run_id is None else 1
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _fetch(self, page):
+        return fetch_run_page(self.repo_full_name, self.token, self.workflow_id, page, self.created)
+
+    def _put(self, item):
+        """Put an item in the queue, giving up once the consumer stopped. Returns False if stopped."""
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _reaches_watermark(self, workflow_runs):
+        return self.stop_run_id is not None and any(run['id'] <= self.stop_run_id for run in workflow_runs)
+
+    def _produce(self):
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            workflow_runs, total_count, has_next_page = self._fetch(1)
+            if not self._list_pages(executor, workflow_runs, total_count, has_next_page):
+                return
+            # The whole listing was queued: report the runs GitHub did not list, like iter_run_pages
+            if is_listing_truncated(total_count, self.created):
+                self._put(_truncated_listing_error(self.repo_full_name, self.workflow_id, self.created, total_count))
+        except Exception as e:
+            self._put(e)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._put(self._END)
+
+    def _list_pages(self, executor, workflow_runs, total_count, has_next_page):
+        """
+        Queue page 1 and the following pages. Returns True when the end of the listing was
+        reached, False when the consumer stopped or the listing stopped at the watermark.
+        """
+        if not workflow_runs:
+            return True
+        if not self._put((1, workflow_runs)):
+            return False
+        if not has_next_page:
+            return not self._reaches_watermark(workflow_runs)
+
+        last_page = max(1, math.ceil(total_count / RUNS_PER_PAGE))
+        if self.created:
+            last_page = min(last_page, MAX_FILTERED_RUNS // RUNS_PER_PAGE)
+        watermark_page = None
+        if self._reaches_watermark(workflow_runs):
+            # Older pages were ingested by a previous sync; the consumer needs at most the next one
+            watermark_page, last_page = 1, 2
+
+        pending = deque()
+        next_page = 2
+        while not self._stopped.is_set():
+            # Keep a sliding window of page requests in flight
+            while len(pending) < self.workers and next_page <= last_page:
+                pending.append((next_page, executor.submit(self._fetch, next_page)))
+                next_page += 1
+            if not pending:
+                return watermark_page is None
+
+            page, future = pending.popleft()
+            workflow_runs, _, has_next_page = future.result()
+            if not workflow_runs:
+                return watermark_page is None
+            if not self._put((page, workflow_runs)):
+                return False
+            if watermark_page is not None:
+                continue
+            if self._reaches_watermark(workflow_runs):
+                watermark_page = page
+                last_page = page + 1 if has_next_page else page
+            elif page == last_page and has_next_page:
+                last_page += 1  # Runs created during the listing pushed older runs further back
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        """Stop the producer; pages that were not consumed yet are dropped."""
+        self._stopped.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+
+def prefetch_run_pages(repo_full_name, token, workflow_id=None, created=None,
+                       workers=DEFAULT_PREFETCH_WORKERS, queue_size=DEFAULT_PREFETCH_QUEUE_SIZE, stop_run_id=None):
+    """
+    Same contract as iter_run_pages, but pages are fetched ahead by a RunPagePrefetcher.
+    Closing the generator (or leaving the loop early) stops the prefetching. With
+    `stop_run_id`, no page is fetched after the page that follows the sync watermark.
+    """
+    prefetcher = RunPagePrefetcher(repo_full_name, token, workflow_id, created, workers, queue_size, stop_run_id).start()
+    try:
+        yield from prefetcher
+    finally:
+        prefetcher.close()
+
+
+def find_next_older_runs(workflow_runs, same_branch=False):
+    """
+    For runs listed newest first, return for each position the index of the next
+    older run of the same workflow (and of the same branch with `same_branch`) on
+    the page, or None if there is none.
+    """
+    next_older_runs = [None] * len(workflow_runs)
+    last_seen = {}
+    for idx in range(len(workflow_runs) - 1, -1, -1):
+        run = workflow_runs[idx]
+        key = (run.get('workflow_id'), run.get('head_branch')) if same_branch else run.get('workflow_id')
+        next_older_runs[idx] = last_seen.get(key)
+        last_seen[key] = idx
+    return next_older_runs
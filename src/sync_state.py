@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+
+class WatermarkStore:
+    """
+    Persisted high-water marks of the incremental sync.
+
+    For every repository and listing scope (a workflow id, or a key for the
+    repo-wide listing) the newest ingested run (id and created_at) is stored in a
+    JSON file. Runs are listed newest first, so a listing can stop
+    as soon as it reaches a run at or below the watermark: everything older has
+    already been collected.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._watermarks = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading sync state from {self.path}, starting a full sync: {e}")
+            return {}
+
+    def get(self, repo_full_name, scope):
+        """Return {'run_id': int, 'created_at': str} for the scope, or None if it was never synced."""
+        with self._lock:
+            return self._watermarks.get(repo_full_name, {}).get(str(scope))
+
+    def get_run_id(self, repo_full_name, scope):
+        """Return the id of the newest ingested run of the scope, or None."""
+        watermark = self.get(repo_full_name, scope)
+        return watermark['run_id'] if watermark else None
+
+    def advance(self, repo_full_name, scope, run_id, created_at):
+        """Move the watermark of the scope forward to `run_id` (never backwards) and persist it."""
+        with self._lock:
+            repo_watermarks = self._watermarks.setdefault(repo_full_name, {})
+            current = repo_watermarks.get(str(scope))
+            if current and current['run_id'] >= run_id:
+                return
+            repo_watermarks[str(scope)] = {'run_id': run_id, 'created_at': created_at}
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(self._watermarks, file, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+
+
+# Quota assumed for a token whose rate-limit headers have not been seen yet
+UNKNOWN_QUOTA = 5000
+
+
+class TokenPool:
+    """
+    Pool of GitHub tokens with rate-limit-aware dispatch.
+
+    The remaining quota and reset time of every token are tracked from the
+    X-RateLimit-* response headers. Each request is routed to the token with the
+    most headroom; the pool only sleeps when every token is exhausted, and then
+    only until the earliest reset.
+
+    A TokenPool can be passed anywhere a token string is accepted by
+    request_github.github_get / get_request.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = [token for token in dict.fromkeys(tokens) if token]  # Drop duplicates, keep order
+        self._remaining = {token: None for token in self.tokens}
+        self._reset = {token: 0 for token in self.tokens}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def _available_quota(self, token, now):
+        remaining = self._remaining[token]
+        if remaining is None or (self._reset[token] and self._reset[token] <= now):
+            return UNKNOWN_QUOTA  # Never seen or window already reset
+        return remaining
+
+    def acquire(self):
+        """
+        Return the token with the most remaining quota.
+        Blocks until the earliest reset when all tokens are exhausted. Returns None for an empty pool.
+        """
+        if not self.tokens:
+            return None
+
+        while True:
+            with self._lock:
+                now = time.time()
+                best_token = max(self.tokens, key=lambda token: self._available_quota(token, now))
+                best_quota = self._available_quota(best_token, now)
+
+                if best_quota > 0:
+                    # Reserve one request so concurrent callers spread over the pool
+                    if self._remaining[best_token] is not None and self._reset[best_token] > now:
+                        self._remaining[best_token] = best_quota - 1
+                    return best_token
+
+                earliest_reset = min(self._reset.values())
+                sleep_time = max(0, earliest_reset - now) + 10
+
+            logging.warning(f"All {len(self.tokens)} token(s) exhausted. Sleeping for {sleep_time:.0f} seconds.")
+            time.sleep(sleep_time)
+
+    def update(self, token, headers):
+        """Record the quota reported by a response made with `token`."""
+        if token not in self._remaining:
+            return
+
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_time = headers.get('X-RateLimit-Reset')
+        if remaining is None:
+            return
+
+        with self._lock:
+            self._remaining[token] = int(remaining)
+            if reset_time:
+                self._reset[token] = int(reset_time)
+
+    def total_remaining(self):
+        """Sum of the remaining quota over all tokens (unknown tokens count as a full quota)."""
+        with self._lock:
+            now = time.time()
+            return sum(self._available_quota(token, now) for token in self.tokens)
@@ -0,0 +1,75 @@
+import contextlib
+import os
+import sys
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import run_listing
+from run_listing import MAX_FILTERED_RUNS, RUNS_PER_PAGE, RunListingError, iter_run_pages, prefetch_run_pages
+
+
+class FakeResponse:
+    def __init__(self, data, has_next_page):
+        self.status_code = 200
+        self.headers = {'Link': '<...>; rel="next"' if has_next_page else ''}
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def fake_runs_endpoint(total_count):
+    """Runs endpoint of a repository with `total_count` runs of which GitHub lists at most MAX_FILTERED_RUNS."""
+    listed = min(total_count, MAX_FILTERED_RUNS)
+    runs = [{'id': run_id, 'workflow_id': 1} for run_id in range(total_count, total_count - listed, -1)]
+    calls = []
+
+    def github_get(url, token=None, **kwargs):
+        page = int(parse_qs(urlparse(url).query)['page'][0])
+        calls.append(page)
+        page_runs = runs[(page - 1) * RUNS_PER_PAGE:page * RUNS_PER_PAGE]
+        return FakeResponse({'total_count': total_count, 'workflow_runs': page_runs}, page * RUNS_PER_PAGE < listed)
+
+    return github_get, calls
+
+
+class TruncatedListingTest(unittest.TestCase):
+    def list_pages(self, listing, total_count, **kwargs):
+        github_get, calls = fake_runs_endpoint(total_count)
+        pages = []
+        with mock.patch.object(run_listing, "github_get", github_get):
+            with self.assertRaises(RunListingError) if kwargs.pop("truncated") else contextlib.nullcontext():
+                for page, _ in listing("o/r", "token", **kwargs):
+                    pages.append(page)
+        return pages, calls
+
+    def test_capped_created_listing_is_incomplete(self):
+        pages, _ = self.list_pages(iter_run_pages, 1500, created="<=2024-06-30", truncated=True)
+        self.assertEqual(pages, list(range(1, MAX_FILTERED_RUNS // RUNS_PER_PAGE + 1)))
+
+    def test_capped_created_listing_is_incomplete_with_prefetch(self):
+        pages, _ = self.list_pages(prefetch_run_pages, 1500, created="<=2024-06-30", workers=4, truncated=True)
+        self.assertEqual(pages, list(range(1, MAX_FILTERED_RUNS // RUNS_PER_PAGE + 1)))
+
+    def test_listing_under_the_cap_is_complete(self):
+        for listing in (iter_run_pages, prefetch_run_pages):
+            pages, _ = self.list_pages(listing, 450, created="<=2024-06-30", truncated=False)
+            self.assertEqual(pages, [1, 2, 3, 4, 5])
+
+    def test_unfiltered_listing_is_complete(self):
+        pages, _ = self.list_pages(iter_run_pages, 450, truncated=False)
+        self.assertEqual(pages, [1, 2, 3, 4, 5])
+
+    def test_prefetch_stopping_at_the_watermark_is_complete(self):
+        # Older runs were ingested by a previous sync, so the runs GitHub did not list do not matter
+        pages, calls = self.list_pages(prefetch_run_pages, 1500, created="<=2024-06-30", workers=4,
+                                       stop_run_id=1450, truncated=False)
+        self.assertEqual(pages, [1, 2])
+        self.assertEqual(sorted(calls), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()